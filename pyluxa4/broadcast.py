@@ -0,0 +1,77 @@
+"""
+Broadcast server events to subscribers as Server-Sent Events.
+
+Each subscriber has a bounded buffer. Publishing never blocks: a subscriber whose
+buffer is full is dropped so a slow consumer cannot hold up the server.
+"""
+import itertools
+import json
+from gevent.queue import Queue, Full, Empty
+
+BUFFER_SIZE = 256
+# Send a comment this often so proxies and clients can tell the connection is still alive.
+KEEPALIVE = 15
+
+
+class Subscriber:
+    """A subscriber to broadcast events."""
+
+    def __init__(self, maxsize):
+        """Initialize."""
+
+        self.queue = Queue(maxsize)
+        self.closed = False
+
+
+class Broadcaster:
+    """Publish events to all subscribers."""
+
+    def __init__(self, maxsize=BUFFER_SIZE, keepalive=KEEPALIVE):
+        """Initialize."""
+
+        self.maxsize = maxsize
+        self.keepalive = keepalive
+        self.subscribers = set()
+        self.ids = itertools.count(1)
+
+    def subscribe(self):
+        """Add a subscriber."""
+
+        subscriber = Subscriber(self.maxsize)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber."""
+
+        subscriber.closed = True
+        self.subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        """Publish an event to all subscribers, dropping any that cannot keep up."""
+
+        if not self.subscribers:
+            return
+
+        message = 'id: {}\nevent: {}\ndata: {}\n\n'.format(next(self.ids), event, json.dumps(data))
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+            except Full:
+                self.unsubscribe(subscriber)
+
+    def stream(self, subscriber):
+        """Yield messages for a subscriber until it is dropped or disconnects."""
+
+        try:
+            yield ': subscribed\n\n'
+            while not subscriber.closed:
+                try:
+                    message = subscriber.queue.get(timeout=self.keepalive)
+                except Empty:
+                    message = ': keepalive\n\n'
+                if subscriber.closed:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
@@ -3,9 +3,11 @@ import argparse
 import os
 import sys
 import json
+from datetime import datetime
 from . import common as cmn
 from . import __meta__
 from . import client
+from . import registry
 
 
 def process_schedule(schedule):
@@ -80,6 +82,16 @@ class TimerAction(argparse.Action):
         setattr(namespace, self.dest, values)
 
 
+# Actions for command arguments that need to be resolved or validated.
+ACTIONS = {
+    'led': LedAction,
+    'pattern': PatternAction,
+    'wave': WaveAction,
+    'speed': SpeedAction,
+    'repeat': RepeatAction
+}
+
+
 def connection_args(parser):
     """Connection arguments to control the request."""
 
@@ -90,113 +102,46 @@ def connection_args(parser):
         help="Enable https requests: enable verification (1), disable verification(0), or specify a certificate."
     )
     parser.add_argument('--timeout', type=int, default=client.TIMEOUT, help="Timeout")
-
-
-def cmd_color(argv):
-    """Set to color."""
-
-    parser = argparse.ArgumentParser(prog='pyluxa4 color', description="Set color")
-    parser.add_argument('color', help="Color value.")
-    parser.add_argument('--led', action=LedAction, default=cmn.LED_ALL, help="LED: 1-6, back, front, or all")
-    parser.add_argument('--token', default='', help="Send API token")
-    connection_args(parser)
-    args = parser.parse_args(argv)
-
-    return client.LuxRest(args.host, args.port, args.secure, args.token).color(
-        args.color,
-        led=args.led,
-        timeout=args.timeout
-    )
-
-
-def cmd_fade(argv):
-    """Fade to color."""
-
-    parser = argparse.ArgumentParser(prog='pyluxa4 fade', description="Fade to color")
-    parser.add_argument('color', help="Color value.")
-    parser.add_argument('--led', action=LedAction, default=cmn.LED_ALL, help="LED: 1-6, back, tab, or all")
-    parser.add_argument('--speed', action=SpeedAction, type=int, default=0, help="Speed of fade: 0-255")
-    parser.add_argument('--token', default='', help="Send API token")
-    connection_args(parser)
-    args = parser.parse_args(argv)
-
-    return client.LuxRest(args.host, args.port, args.secure, args.token).fade(
-        args.color,
-        led=args.led,
-        speed=args.speed,
-        timeout=args.timeout
-    )
-
-
-def cmd_strobe(argv):
-    """Strobe color."""
-
-    parser = argparse.ArgumentParser(prog='pyluxa4 strobe', description="Strobe color")
-    parser.add_argument('color', help="Color value.")
-    parser.add_argument('--led', action=LedAction, default=cmn.LED_ALL, help="LED: 1-6, back, front, or all")
-    parser.add_argument('--speed', action=SpeedAction, type=int, default=0, help="Speed of strobe: 0-255")
-    parser.add_argument('--repeat', action=RepeatAction, type=int, default=0, help="Number of times to repeat: 0-255")
-    parser.add_argument('--token', default='', help="Send API token")
-    connection_args(parser)
-    args = parser.parse_args(argv)
-
-    return client.LuxRest(args.host, args.port, args.secure, args.token).strobe(
-        args.color,
-        led=args.led,
-        speed=args.speed,
-        repeat=args.repeat,
-        timeout=args.timeout
+    parser.add_argument(
+        '--unix-socket', default=None, help="Connect to a local server over a Unix domain socket instead of TCP"
     )
 
 
-def cmd_wave(argv):
-    """Show color with wave effect."""
+def field_options(field, help):  # noqa: A002
+    """Get the `argparse` options for a command field."""
 
-    parser = argparse.ArgumentParser(prog='pyluxa4 wave', description="Wave effect")
-    parser.add_argument('color', help="Color value.")
-    parser.add_argument('--wave', action=WaveAction, default=cmn.WAVE_SHORT, help="Wave configuration: 1-5")
-    parser.add_argument('--speed', action=SpeedAction, type=int, default=0, help="Speed of wave effect: 0-255")
-    parser.add_argument('--repeat', action=RepeatAction, type=int, default=0, help="Number of times to repeat: 0-255")
-    parser.add_argument('--token', default='', help="Send API token")
-    connection_args(parser)
-    args = parser.parse_args(argv)
-
-    return client.LuxRest(args.host, args.port, args.secure, args.token).wave(
-        args.color,
-        wave=args.wave,
-        speed=args.speed,
-        repeat=args.repeat,
-        timeout=args.timeout
-    )
+    options = {'help': help}
+    if field.name in ACTIONS:
+        options['action'] = ACTIONS[field.name]
+    if field.kind is int and field.resolve is None:
+        options['type'] = int
+    return options
 
 
-def cmd_pattern(argv):
-    """Show pattern."""
+def cmd_device(name, argv):
+    """Send a device command from the command registry."""
 
-    parser = argparse.ArgumentParser(prog='pyluxa4 pattern', description="Display pattern")
-    parser.add_argument('pattern', action=PatternAction, help="Pattern value.")
-    parser.add_argument('--repeat', action=RepeatAction, type=int, default=0, help="Number of times to repeat: 0-255")
+    command = registry.COMMANDS[name]
+    parser = argparse.ArgumentParser(prog='pyluxa4 {}'.format(name), description=command.description)
+    for field in command.fields:
+        options = field_options(field, command.help.get(field.name, field.help))
+        if field.positional:
+            parser.add_argument(field.name, **options)
+        else:
+            parser.add_argument('--{}'.format(field.name), default=field.default, **options)
     parser.add_argument('--token', default='', help="Send API token")
-    connection_args(parser)
-    args = parser.parse_args(argv)
-
-    return client.LuxRest(args.host, args.port, args.secure, args.token).pattern(
-        args.pattern,
-        repeat=args.repeat,
-        timeout=args.timeout
+    parser.add_argument(
+        '--device', default=None, help="Serial number of the device to send to (defaults to the server's device)"
     )
-
-
-def cmd_off(argv):
-    """Set off."""
-
-    parser = argparse.ArgumentParser(prog='pyluxa4 off', description="Turn off")
-    parser.add_argument('--token', default='', help="Send API token")
     connection_args(parser)
     args = parser.parse_args(argv)
 
-    return client.LuxRest(args.host, args.port, args.secure, args.token).off(
-        timeout=args.timeout
+    values = vars(args)
+    lux = client.LuxRest(args.host, args.port, args.secure, args.token, args.device, args.unix_socket)
+    return getattr(lux, command.method)(
+        *[values[field.name] for field in command.fields if field.positional],
+        timeout=args.timeout,
+        **{field.name: values[field.name] for field in command.fields if not field.positional}
     )
 
 
@@ -207,7 +152,7 @@ def cmd_version(argv):
     connection_args(parser)
     args = parser.parse_args(argv)
 
-    return client.LuxRest(args.host, args.port, args.secure).version(timeout=args.timeout)
+    return client.LuxRest(args.host, args.port, args.secure, unix_socket=args.unix_socket).version(timeout=args.timeout)
 
 
 def cmd_kill(argv):
@@ -218,7 +163,7 @@ def cmd_kill(argv):
     connection_args(parser)
     args = parser.parse_args(argv)
 
-    return client.LuxRest(args.host, args.port, args.secure, args.token).kill(
+    return client.LuxRest(args.host, args.port, args.secure, args.token, unix_socket=args.unix_socket).kill(
         timeout=args.timeout
     )
 
@@ -234,7 +179,7 @@ def cmd_scheduler(argv):
     connection_args(parser)
     args = parser.parse_args(argv)
 
-    return client.LuxRest(args.host, args.port, args.secure, args.token).scheduler(
+    return client.LuxRest(args.host, args.port, args.secure, args.token, unix_socket=args.unix_socket).scheduler(
         schedule=process_schedule(args.schedule),
         clear=args.clear,
         cancel=args.cancel,
@@ -247,19 +192,20 @@ def cmd_timer(argv):
 
     parser = argparse.ArgumentParser(prog='pyluxa4 timer', description="Setup timers")
     parser.add_argument(
-        '--times', help="List of relative times (<num hours>:<num minutes>) separated by commas.", required=True
+        '--times',
+        help="List of relative times (<num hours>:<num minutes>[:<num seconds>]) separated by commas.",
+        required=True
     )
     group = parser.add_mutually_exclusive_group(required=True)
-    group.add_argument('--cmd', help="Timer event cmd: color, strobe, fade, wave, pattern, or off")
+    group.add_argument('--cmd', choices=list(registry.COMMANDS), help="Timer event cmd")
     group.add_argument('--type', help=argparse.SUPPRESS)
-    parser.add_argument('--led', action=LedAction, default=cmn.LED_ALL, help="LED: 1-6, back, tab, or all")
-    parser.add_argument('--color', help="Color of timer alerts.")
-    parser.add_argument('--pattern', action=PatternAction, help="Pattern of timer alerts.")
-    parser.add_argument(
-        '--wave', action=WaveAction, default=cmn.WAVE_SHORT, help="Force a given wave effect instead of strobe."
-    )
-    parser.add_argument('--speed', action=SpeedAction, type=int, default=0, help="Speed of strobe or wave: 0-255")
-    parser.add_argument('--repeat', action=RepeatAction, type=int, default=0, help="Number of times to repeat: 0-255")
+    # Every argument of every command is an option, only those of the chosen command are sent.
+    fields = {}
+    for command in registry.COMMANDS.values():
+        for field in command.fields:
+            fields.setdefault(field.name, field)
+    for field in fields.values():
+        parser.add_argument('--{}'.format(field.name), default=None, **field_options(field, field.help))
     parser.add_argument(
         '--cycle', action=TimerAction, type=int, default=1, help="Number of times to cycle through the timers."
     )
@@ -270,89 +216,36 @@ def cmd_timer(argv):
     args = parser.parse_args(argv)
 
     if args.type:
-        command = args.type
+        name = args.type
         cmn.warn_deprecated('--type has been deprecated, please use --cmd')
     else:
-        command = args.cmd
-
-    if command == "color":
-        cmd = "color"
-        color_key = "color"
-        color_value = args.color
-        led = args.led
-        speed = None
-        repeat = None
-        wave = None
-    elif command == "fade":
-        cmd = "fade"
-        color_key = "color"
-        color_value = args.color
-        led = args.led
-        speed = args.speed
-        repeat = None
-        wave = None
-    elif command == "strobe":
-        cmd = "strobe"
-        color_key = "color"
-        color_value = args.color
-        led = args.led
-        speed = args.speed
-        repeat = args.repeat
-        wave = None
-    elif command == "wave":
-        cmd = "wave"
-        color_key = "color"
-        color_value = args.color
-        led = None
-        speed = args.speed
-        repeat = args.repeat
-        wave = args.wave
-    elif command == "pattern":
-        cmd = "pattern"
-        color_key = "pattern"
-        color_value = args.pattern
-        led = None
-        repeat = args.repeat
-        speed = None
-        wave = None
-    elif command == "off":
-        cmd = "off"
-        color_key = None
-        color_value = None
-        led = None
-        repeat = None
-        speed = None
-        wave = None
-    else:
-        parser.error('Unrecognized --type {}'.format(command))
-
-    if cmd in ('color', 'fade', 'strobe', 'wave') and color_value is None:
-        parser.error('--color is required with --type color')
-    elif cmd == 'pattern' and color_value is None:
-        parser.error('--pattern is required with --type {}'.format(cmd))
+        name = args.cmd
+
+    command = registry.COMMANDS.get(name)
+    if command is None:
+        parser.error('Unrecognized --type {}'.format(name))
+
+    # Arguments that are not given are left for the server to fill in with their defaults.
+    values = vars(args)
+    arguments = {}
+    for field in command.fields:
+        value = values[field.name]
+        if value is not None:
+            arguments[field.name] = value
+        elif field.default is registry.REQUIRED:
+            parser.error('--{} is required with --cmd {}'.format(field.name, command.name))
 
     schedule = {
-        "cmd": cmd,
+        "cmd": command.name,
         "timer": args.cycle,
         "start": args.start,
         "end": args.end,
         "days": "all",
         "times": args.times.split(','),
-        "args": {}
+        "args": arguments
     }
 
-    if color_key is not None:
-        schedule['args'][color_key] = color_value
-    if repeat is not None:
-        schedule['args']['repeat'] = repeat
-    if speed is not None:
-        schedule['args']['speed'] = speed
-    if wave is not None:
-        schedule['args']['wave'] = wave
-    if led is not None:
-        schedule['args']['led'] = led
-
-    return client.LuxRest(args.host, args.port, args.secure, args.token).scheduler(
+    return client.LuxRest(args.host, args.port, args.secure, args.token, unix_socket=args.unix_socket).scheduler(
         schedule=[schedule],
         clear=False,
         timeout=args.timeout
@@ -369,11 +262,11 @@ def cmd_get(argv):
     args = parser.parse_args(argv)
 
     if args.info == 'schedule':
-        return client.LuxRest(args.host, args.port, args.secure, args.token).get_schedule(
+        return client.LuxRest(args.host, args.port, args.secure, args.token, unix_socket=args.unix_socket).get_schedule(
             timeout=args.timeout
         )
     elif args.info == 'timers':
-        return client.LuxRest(args.host, args.port, args.secure, args.token).get_timers(
+        return client.LuxRest(args.host, args.port, args.secure, args.token, unix_socket=args.unix_socket).get_timers(
             timeout=args.timeout
         )
     else:
@@ -395,6 +288,32 @@ def cmd_serve(argv):
     parser.add_argument(
         '--token', default='', help="Assign a token that must be used when sending commands"
     )
+    parser.add_argument(
+        '--window', type=float, default=60,
+        help="Seconds after an event's time in which it can still fire (events found later are skipped)"
+    )
+    parser.add_argument(
+        '--async', dest='async_mode', action='store_true',
+        help="Queue commands and respond immediately with 202 and a command ID instead of waiting on the device"
+    )
+    parser.add_argument(
+        '--stream-port', type=int, default=None, help="Port to accept streamed color frames on (disabled by default)"
+    )
+    parser.add_argument(
+        '--udp-port', type=int, default=None, help="Port to accept signed binary UDP commands on (disabled by default)"
+    )
+    parser.add_argument(
+        '--unix-socket', default=None,
+        help="Also serve the API on a Unix domain socket at this path (requests over it do not need a token)"
+    )
+    parser.add_argument(
+        '--all-devices', action='store_true',
+        help="Open every connected device and route /device/<serial>/ requests to each"
+    )
+    parser.add_argument(
+        '--trace', choices=('header', 'log', 'both'), default=None,
+        help="Time the steps of each request and report them in a Server-Timing header, the log, or both"
+    )
     args = parser.parse_args(argv)
 
     path = args.device_path
@@ -405,7 +324,45 @@ def cmd_serve(argv):
     if args.ssl_cert:
         kwargs['certfile'] = args.ssl_cert
 
-    server.run(args.host, args.port, index, path, args.token, process_schedule(args.schedule), **kwargs)
+    server.run(
+        args.host, args.port, index, path, args.token, process_schedule(args.schedule), window=args.window,
+        async_mode=args.async_mode, stream_port=args.stream_port, trace=args.trace,
+        all_devices=args.all_devices, udp_port=args.udp_port,
+        unix_socket=args.unix_socket, **kwargs
+    )
+
+
+def cmd_simulate(argv):
+    """Simulate a schedule and print the commands that would run."""
+
+    from . import simulator
+
+    parser = argparse.ArgumentParser(prog='pyluxa4 simulate', description="Simulate a schedule")
+    parser.add_argument('--schedule', required=True, help="JSON schedule file.")
+    parser.add_argument('--start', default=None, help="Start of simulation (YYYY-MM-DD HH:MM), defaults to now.")
+    parser.add_argument('--days', type=float, default=7, help="Number of days to simulate.")
+    args = parser.parse_args(argv)
+
+    if args.start:
+        start = datetime.strptime(args.start, '%Y-%m-%d %H:%M').timestamp()
+    else:
+        start = datetime.now().timestamp()
+
+    try:
+        commands = simulator.simulate(process_schedule(args.schedule), start, start + args.days * 24 * 60 * 60)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    for t, cmd, cmd_args, kwargs in commands:
+        print(
+            '{} {} {}'.format(
+                datetime.fromtimestamp(t).strftime('%a %Y-%m-%d %H:%M:%S'),
+                cmd,
+                ' '.join([repr(a) for a in cmd_args] + ['{}={!r}'.format(k, v) for k, v in kwargs.items()])
+            ).rstrip()
+        )
+    return 0
 
 
 def cmd_list(argv):
@@ -434,7 +391,7 @@ def main():
         action='store',
         help=(
             "Command to send: color, off, fade, strobe, wave, pattern, api, serve, "
-            "kill, get, schedule, and timer"
+            "kill, get, schedule, timer, and simulate"
         )
     )
     args = parser.parse_args(argv[0:1])
@@ -443,6 +400,8 @@ def main():
         cmd_serve(argv[1:])
     elif args.command == 'list':
         cmd_list(argv[1:])
+    elif args.command == 'simulate':
+        status = cmd_simulate(argv[1:])
     else:
         if args.command == 'api':
             resp = cmd_version(argv[1:])
@@ -450,23 +409,8 @@ def main():
         elif args.command == 'kill':
             resp = cmd_kill(argv[1:])
 
-        elif args.command == 'color':
-            resp = cmd_color(argv[1:])
-
-        elif args.command == 'off':
-            resp = cmd_off(argv[1:])
-
-        elif args.command == 'fade':
-            resp = cmd_fade(argv[1:])
-
-        elif args.command == 'strobe':
-            resp = cmd_strobe(argv[1:])
-
-        elif args.command == 'wave':
-            resp = cmd_wave(argv[1:])
-
-        elif args.command == 'pattern':
-            resp = cmd_pattern(argv[1:])
+        elif args.command in registry.COMMANDS:
+            resp = cmd_device(args.command, argv[1:])
 
         elif args.command == 'scheduler':
             resp = cmd_scheduler(argv[1:])
@@ -1,5 +1,9 @@
 """Luxafor client API."""
+import socket
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
 import json
 from .common import (
     LED_ALL, LED_BACK, LED_FRONT, LED_1, LED_2, LED_3, LED_4, LED_5, LED_6,
@@ -27,14 +31,71 @@ PORT = 5000
 TIMEOUT = 5
 
 
+class UnixConnection(HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, *args, socket_path, **kwargs):
+        """Initialize."""
+
+        super().__init__(*args, **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        """Connect to the socket."""
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class UnixConnectionPool(HTTPConnectionPool):
+    """Connection pool for a Unix domain socket."""
+
+    ConnectionCls = UnixConnection
+
+
+class UnixAdapter(HTTPAdapter):
+    """Send every request to a Unix domain socket, whatever host the URL names."""
+
+    def __init__(self, socket_path, **kwargs):
+        """Initialize."""
+
+        super().__init__(**kwargs)
+        self.pool = UnixConnectionPool('localhost', socket_path=socket_path)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        """Get the connection pool."""
+
+        return self.pool
+
+    def get_connection(self, url, proxies=None):
+        """Get the connection pool (for older versions of Requests)."""
+
+        return self.pool
+
+    def close(self):
+        """Close the connection pool."""
+
+        super().close()
+        self.pool.close()
+
+
 class LuxRest:
     """Class to post commands to the REST API."""
 
-    def __init__(self, host=HOST, port=PORT, verify=None, token=''):
+    def __init__(self, host=HOST, port=PORT, verify=None, token='', device=None, unix_socket=None):
         """Initialize."""
 
         self.host = host
         self.port = port
+        # Requests go through a session bound to the socket when talking to a local server over a Unix domain socket.
+        self.session = requests
+        if unix_socket is not None:
+            self.session = requests.Session()
+            self.session.mount('http://', UnixAdapter(unix_socket))
+        # Serial number of the device to send commands to, or `None` for the server's default device.
+        self.prefix = '' if device is None else 'device/{}/'.format(device)
         self.http = 'http'
         self.verify = True
         self.token = token
@@ -54,7 +115,7 @@ class LuxRest:
             r = {"status": "fail", "code": resp.status_code, "error": resp.text}
         return r
 
-    def _post(self, command, payload, timeout):
+    def _post(self, command, payload, timeout, prefix='command/'):
         """Post a REST command."""
 
         if timeout == 0:
@@ -67,13 +128,14 @@ class LuxRest:
             headers['content-type'] = 'application/json'
 
         try:
-            resp = requests.post(
-                '%s://%s:%d/pyluxa4/api/v%s.%s/command/%s' % (
+            resp = self.session.post(
+                '%s://%s:%d/pyluxa4/api/v%s.%s/%s%s' % (
                     self.http,
                     self.host,
                     self.port,
                     __meta__.__version_info__[0],
                     __meta__.__version_info__[1],
+                    prefix,
                     command
                 ),
                 data=payload,
@@ -97,7 +159,7 @@ class LuxRest:
         headers = {'Authorization': 'Bearer {}'.format(self.token)}
 
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 '%s://%s:%d/pyluxa4/api/v%s.%s/%s' % (
                     self.http,
                     self.host,
@@ -124,7 +186,7 @@ class LuxRest:
             timeout = None
 
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 '%s://%s:%d/pyluxa4/api/version' % (
                     self.http,
                     self.host,
@@ -149,7 +211,8 @@ class LuxRest:
                 "color": color,
                 "led": led
             },
-            timeout
+            timeout,
+            prefix=self.prefix + 'command/'
         )
 
     def fade(self, color, *, led=LED_ALL, speed=0, timeout=TIMEOUT):
@@ -162,7 +225,8 @@ class LuxRest:
                 "led": led,
                 "speed": speed
             },
-            timeout
+            timeout,
+            prefix=self.prefix + 'command/'
         )
 
     def strobe(self, color, *, led=LED_ALL, speed=0, repeat=0, timeout=TIMEOUT):
@@ -176,7 +240,8 @@ class LuxRest:
                 "speed": speed,
                 "repeat": repeat
             },
-            timeout
+            timeout,
+            prefix=self.prefix + 'command/'
         )
 
     def wave(self, color, *, wave=WAVE_SHORT, speed=0, repeat=0, timeout=TIMEOUT):
@@ -190,7 +255,8 @@ class LuxRest:
                 "speed": speed,
                 "repeat": repeat
             },
-            timeout
+            timeout,
+            prefix=self.prefix + 'command/'
         )
 
     def pattern(self, pattern, *, led=LED_ALL, repeat=0, timeout=TIMEOUT):
@@ -202,7 +268,8 @@ class LuxRest:
                 "pattern": pattern,
                 "repeat": repeat
             },
-            timeout
+            timeout,
+            prefix=self.prefix + 'command/'
         )
 
     def off(self, *, timeout=TIMEOUT):
@@ -211,7 +278,23 @@ class LuxRest:
         return self._post(
             "off",
             None,
-            timeout
+            timeout,
+            prefix=self.prefix + 'command/'
+        )
+
+    def batch(self, commands, *, timeout=TIMEOUT):
+        """
+        Send a batch of commands to be run together.
+
+        Commands are given as `(cmd, args)` pairs where `args` is a dictionary of the
+        command's arguments: `[('color', {'color': 'red', 'led': 1}), ('off', {})]`.
+        """
+
+        return self._post(
+            "commands",
+            [{"cmd": cmd, "args": args} for cmd, args in commands],
+            timeout,
+            prefix=self.prefix
         )
 
     def scheduler(self, *, schedule=None, clear=False, cancel=False, timeout=TIMEOUT):
@@ -243,6 +326,22 @@ class LuxRest:
             timeout
         )
 
+    def command_status(self, command_id, *, timeout=TIMEOUT):
+        """Get the state of a command queued by a server running commands asynchronously."""
+
+        return self._get(
+            self.prefix + "queue/%d" % command_id,
+            timeout
+        )
+
+    def devices(self, *, timeout=TIMEOUT):
+        """List the devices the server has open."""
+
+        return self._get(
+            "devices",
+            timeout
+        )
+
     def kill(self, *, timeout=TIMEOUT):
         """Kill the server."""
 
@@ -1,5 +1,7 @@
 """Common functions and constants."""
+import functools
 import warnings
+from .csscolors import name2hex
 
 LED_ALL = 0xff
 LED_FRONT = 0x41
@@ -44,6 +46,9 @@ COLOR_VALID = frozenset(
 BYTE_MIN = 0
 BYTE_MAX = 255
 
+# Number of resolved colors to remember
+COLOR_CACHE_SIZE = 256
+
 
 LED_MAP = {
     "all": LED_ALL,
@@ -185,6 +190,36 @@ def resolve_wave(value):
     return w
 
 
+@functools.lru_cache(maxsize=COLOR_CACHE_SIZE)
+def resolve_color(color):
+    """Resolve color."""
+
+    orig = color = color.lower()
+    if color == 'off':
+        color = 'black'
+    if not color.startswith('#'):
+        color = name2hex(color)
+        if color is None:
+            raise ValueError('{} is not a valid color name'.format(orig))
+
+    if len(color) == 7:
+        color = (
+            int(color[1:3], 16),
+            int(color[3:5], 16),
+            int(color[5:7], 16)
+        )
+    elif len(color) == 4:
+        color = (
+            int(color[1:2] * 2, 16),
+            int(color[2:3] * 2, 16),
+            int(color[3:4] * 2, 16)
+        )
+    else:
+        raise ValueError('{} is not a valid color code'.format(orig))
+
+    return color
+
+
 def warn_deprecated(message, stacklevel=2):  # pragma: no cover
     """Warn deprecated."""
 
@@ -0,0 +1,194 @@
+"""
+Cron expressions.
+
+Expressions are compiled into bit masks for minutes, hours, days of the month,
+months, and days of the week. The next matching time is found by scanning
+the bit masks instead of stepping through time minute by minute.
+
+```
+┌───────────── minute (0 - 59)
+│ ┌───────────── hour (0 - 23)
+│ │ ┌───────────── day of the month (1 - 31)
+│ │ │ ┌───────────── month (1 - 12 or jan - dec)
+│ │ │ │ ┌───────────── day of the week (0 - 7 or sun - sat, 0 and 7 are Sunday)
+│ │ │ │ │
+* * * * *
+```
+
+Each field accepts `*`, single values, ranges (`1-5`), steps (`*/15`, `1-30/5`),
+and comma separated lists of any of these.
+"""
+from datetime import datetime, timedelta
+import calendar
+
+MONTH_NAMES = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+DAY_NAMES = {
+    'sun': 0, 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5, 'sat': 6
+}
+
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *'
+}
+
+# How many years ahead to look before giving up on an expression that can never match (Feb 30th).
+MAX_YEARS = 8
+
+
+def next_bit(mask, start):
+    """Get the index of the first set bit at or after `start`, or -1 if there is none."""
+
+    m = mask >> start
+    if not m:
+        return -1
+    return start + (m & -m).bit_length() - 1
+
+
+def parse_value(value, names):
+    """Parse a single value."""
+
+    value = value.lower()
+    if value in names:
+        return names[value]
+    return int(value)
+
+
+def parse_field(field, mn, mx, names=None):
+    """Parse a field into a bit mask."""
+
+    if names is None:
+        names = {}
+
+    mask = 0
+    for item in field.split(','):
+        step = 1
+        stepped = '/' in item
+        if stepped:
+            item, step = item.split('/', 1)
+            step = int(step)
+            if step < 1:
+                raise ValueError('Invalid cron step in {}'.format(field))
+
+        if item == '*':
+            start, end = mn, mx
+        elif '-' in item:
+            start, end = item.split('-', 1)
+            start = parse_value(start, names)
+            end = parse_value(end, names)
+        else:
+            start = parse_value(item, names)
+            # `5/15` means starting at 5, every 15.
+            end = mx if stepped else start
+
+        if not (mn <= start <= mx and mn <= end <= mx) or start > end:
+            raise ValueError('Invalid cron field {}'.format(field))
+
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+    return mask
+
+
+class Cron:
+    """Compiled cron expression."""
+
+    __slots__ = ('expression', 'minutes', 'hours', 'days', 'months', 'weekdays', 'any_day', 'any_weekday')
+
+    def __init__(self, expression):
+        """Initialize."""
+
+        if not isinstance(expression, str):
+            raise TypeError("'cron' must be a string")
+
+        self.expression = expression
+        expression = MACROS.get(expression.strip().lower(), expression)
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError('Cron expression should have 5 fields, {} were given'.format(len(fields)))
+
+        self.minutes = parse_field(fields[0], 0, 59)
+        self.hours = parse_field(fields[1], 0, 23)
+        self.days = parse_field(fields[2], 1, 31)
+        self.months = parse_field(fields[3], 1, 12, MONTH_NAMES)
+        weekdays = parse_field(fields[4], 0, 7, DAY_NAMES)
+        # Both 0 and 7 are Sunday
+        if weekdays & (1 << 7):
+            weekdays = (weekdays | 1) & 0x7f
+        self.weekdays = weekdays
+        # Only a bare `*` leaves a field unrestricted, a step such as `*/2` still restricts it.
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def month_days(self, year, month):
+        """Get a bit mask (bit 1 is the 1st) of the days that match in the given month."""
+
+        first, count = calendar.monthrange(year, month)
+        valid = ((1 << count) - 1) << 1
+
+        # Rotate the weekday mask so bit 0 is the weekday of the 1st (`calendar` uses Monday as 0),
+        # and repeat it for the length of the month.
+        shift = (first + 1) % 7
+        week = ((self.weekdays >> shift) | (self.weekdays << (7 - shift))) & 0x7f
+        weekdays = 0
+        for offset in range(1, 32, 7):
+            weekdays |= week << offset
+
+        # Like cron, if both days of the month and days of the week are restricted, either can match.
+        if self.any_day:
+            days = weekdays
+        elif self.any_weekday:
+            days = self.days
+        else:
+            days = self.days | weekdays
+        return days & valid
+
+    def next_time(self, after):
+        """Get the first timestamp that matches and is greater than `after`."""
+
+        dt = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year, month, day, hour, minute = dt.year, dt.month, dt.day, dt.hour, dt.minute
+
+        while year - dt.year <= MAX_YEARS:
+            m = next_bit(self.months, month)
+            if m < 0:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if m != month:
+                month, day, hour, minute = m, 1, 0, 0
+
+            d = next_bit(self.month_days(year, month), day)
+            if d < 0:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                if month > 12:
+                    year, month = year + 1, 1
+                continue
+            if d != day:
+                day, hour, minute = d, 0, 0
+
+            h = next_bit(self.hours, hour)
+            if h < 0:
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if h != hour:
+                hour, minute = h, 0
+
+            mi = next_bit(self.minutes, minute)
+            if mi < 0:
+                hour, minute = hour + 1, 0
+                continue
+
+            t = datetime(year, month, day, hour, mi).timestamp()
+            if t > after:
+                return t
+            # Local time repeated due to daylight saving, try the next minute.
+            minute = mi + 1
+
+        raise ValueError('Cron expression {} never matches'.format(self.expression))
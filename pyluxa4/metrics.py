@@ -0,0 +1,173 @@
+"""
+Metrics in the Prometheus text exposition format.
+
+Metrics are kept in plain dictionaries and only formatted when they are requested,
+so recording a value is just a few additions.
+"""
+import bisect
+import time
+
+# Buckets in seconds, from USB writes (sub millisecond) to slow requests.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(names, values, extra=None):
+    """Format labels."""
+
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs
+    )
+
+
+class Counter:
+    """Counter."""
+
+    kind = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        """Initialize."""
+
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        """Increment the counter."""
+
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        """Get the samples of the counter."""
+
+        if not self.labels and not self.values:
+            yield '{}_total {}'.format(self.name, 0)
+        for labels, value in sorted(self.values.items()):
+            yield '{}_total{} {}'.format(self.name, format_labels(self.labels, labels), value)
+
+
+class Histogram:
+    """Histogram."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=BUCKETS):
+        """Initialize."""
+
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # Labels to `[bucket counts..., sum]`, counts are not cumulative until they are formatted.
+        self.values = {}
+
+    def observe(self, value, *labels):
+        """Record a value."""
+
+        data = self.values.get(labels)
+        if data is None:
+            data = self.values[labels] = [0] * (len(self.buckets) + 2)
+        data[bisect.bisect_left(self.buckets, value)] += 1
+        data[-1] += value
+
+    def time(self, start, *labels):
+        """Record the time since `start` (from `time.perf_counter`)."""
+
+        self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self):
+        """Get the samples of the histogram."""
+
+        for labels, data in sorted(self.values.items()):
+            count = 0
+            for bound, n in zip(self.buckets + ('+Inf',), data):
+                count += n
+                yield '{}_bucket{} {}'.format(self.name, format_labels(self.labels, labels, ('le', bound)), count)
+            label = format_labels(self.labels, labels)
+            yield '{}_sum{} {}'.format(self.name, label, data[-1])
+            yield '{}_count{} {}'.format(self.name, label, count)
+
+
+class TimedLock:
+    """Wrap a lock and record how long it takes to acquire it."""
+
+    def __init__(self, lock, histogram):
+        """Initialize."""
+
+        self.lock = lock
+        self.histogram = histogram
+
+    def acquire(self, *args, **kwargs):
+        """Acquire the lock."""
+
+        start = time.perf_counter()
+        result = self.lock.acquire(*args, **kwargs)
+        self.histogram.time(start)
+        return result
+
+    def release(self):
+        """Release the lock."""
+
+        return self.lock.release()
+
+    def __enter__(self):
+        """Enter."""
+
+        self.acquire()
+        return self
+
+    def __exit__(self, type, value, traceback):  # noqa: A002
+        """Exit."""
+
+        self.release()
+
+
+REQUEST_LATENCY = Histogram(
+    'pyluxa4_request_duration_seconds', 'Time spent handling REST requests.', ('command', 'code')
+)
+LOCK_WAIT = Histogram(
+    'pyluxa4_device_lock_wait_seconds', 'Time spent waiting to acquire the device lock.'
+)
+HID_WRITE = Histogram(
+    'pyluxa4_hid_write_duration_seconds', 'Time spent writing to the device.'
+)
+HID_READ = Histogram(
+    'pyluxa4_hid_read_duration_seconds', 'Time spent waiting on reads from the device.'
+)
+SCHEDULER_TICK = Histogram(
+    'pyluxa4_scheduler_tick_duration_seconds', 'Time spent checking the scheduler for events that are due.'
+)
+RECONNECTS = Counter(
+    'pyluxa4_reconnects', 'Attempts to reconnect to the device.', ('result',)
+)
+FAILURES = Counter(
+    'pyluxa4_command_failures', 'Commands that failed.', ('command',)
+)
+QUEUED = Counter(
+    'pyluxa4_commands_queued', 'Commands queued for the device.'
+)
+UDP_DROPPED = Counter(
+    'pyluxa4_udp_dropped', 'UDP commands that were dropped.', ('reason',)
+)
+
+METRICS = (
+    REQUEST_LATENCY, LOCK_WAIT, HID_WRITE, HID_READ, SCHEDULER_TICK, RECONNECTS, FAILURES, QUEUED, UDP_DROPPED
+)
+
+
+def render(metrics=METRICS):
+    """Render metrics in the Prometheus text exposition format."""
+
+    lines = []
+    for metric in metrics:
+        name = metric.name + '_total' if metric.kind == 'counter' else metric.name
+        lines.append('# HELP {} {}'.format(name, metric.description))
+        lines.append('# TYPE {} {}'.format(name, metric.kind))
+        lines.extend(metric.samples())
+    lines.append('')
+    return '\n'.join(lines)
@@ -0,0 +1,120 @@
+"""
+Device command registry.
+
+A single table of the commands that can be sent to a device, the arguments they
+take, and how those arguments are validated. The server, the scheduler, and the
+command line all work from this table, so adding a command is a matter of adding
+an entry here.
+"""
+from . import common as cmn
+
+# Marks an argument that has no default.
+REQUIRED = object()
+
+
+def validate_color(color):
+    """Validate a color."""
+
+    if len(color) == 1:
+        cmn.validate_simple_color(ord(color.upper()))
+    else:
+        cmn.resolve_color(color)
+
+
+class Field:
+    """A command argument."""
+
+    __slots__ = ('name', 'kind', 'default', 'validate', 'resolve', 'positional', 'help')
+
+    def __init__(self, name, kind, default, validate, resolve=None, positional=False, help=''):  # noqa: A002
+        """Initialize."""
+
+        self.name = name
+        self.kind = kind
+        self.default = default
+        self.validate = validate
+        # Resolves names (like `front` for an LED) when the value is given as a string.
+        self.resolve = resolve
+        self.positional = positional
+        self.help = help
+
+
+COLOR = Field('color', str, REQUIRED, validate_color, positional=True, help="Color value.")
+LED = Field('led', int, cmn.LED_ALL, cmn.validate_led, cmn.resolve_led, help="LED: 1-6, back, front, or all")
+SPEED = Field('speed', int, 0, cmn.validate_speed, help="Speed: 0-255")
+REPEAT = Field('repeat', int, 0, cmn.validate_repeat, help="Number of times to repeat: 0-255")
+WAVE = Field('wave', int, cmn.WAVE_SHORT, cmn.validate_wave, cmn.resolve_wave, help="Wave configuration: 1-5")
+PATTERN = Field(
+    'pattern', int, REQUIRED, cmn.validate_pattern, cmn.resolve_pattern, positional=True, help="Pattern value."
+)
+
+
+class Command:
+    """A device command and its arguments."""
+
+    def __init__(self, name, description, fields, method=None, help=None):  # noqa: A002
+        """Initialize."""
+
+        self.name = name
+        self.description = description
+        self.fields = fields
+        # Name of the device method that runs the command.
+        self.method = name if method is None else method
+        # Command specific help for arguments.
+        self.help = {} if help is None else help
+        self.names = frozenset(field.name for field in fields)
+        # Flatten the fields into tuples so parsing is one tight loop.
+        self.compiled = tuple(
+            (f.name, f.kind is int, f.default, f.validate, f.resolve, f.positional) for f in fields
+        )
+
+    def parse(self, arguments, strict=False):
+        """
+        Validate a dictionary of arguments and return the `args` and `kwargs` to call the device method with.
+
+        Unknown arguments are an error if `strict` is enabled and are ignored otherwise.
+        """
+
+        if not isinstance(arguments, dict):
+            raise TypeError("Arguments for '{}' must be an object".format(self.name))
+        if strict:
+            for key in arguments:
+                if key not in self.names:
+                    raise ValueError('Unexpected command argument {}'.format(key))
+
+        args = []
+        kwargs = {}
+        for name, integer, default, validate, resolve, positional in self.compiled:
+            value = arguments.get(name, default)
+            if value is REQUIRED:
+                raise ValueError("'{}' is required for '{}'".format(name, self.name))
+            if resolve is not None and isinstance(value, str):
+                value = resolve(value)
+            elif integer:
+                cmn.is_int(name, value)
+            else:
+                cmn.is_str(name, value)
+            validate(value)
+            if positional:
+                args.append(value)
+            else:
+                kwargs[name] = value
+        return args, kwargs
+
+
+COMMANDS = {
+    command.name: command for command in (
+        Command('color', "Set color", (COLOR, LED)),
+        Command('fade', "Fade to color", (COLOR, LED, SPEED), help={'speed': "Speed of fade: 0-255"}),
+        Command('strobe', "Strobe color", (COLOR, LED, SPEED, REPEAT), help={'speed': "Speed of strobe: 0-255"}),
+        Command('wave', "Wave effect", (COLOR, WAVE, SPEED, REPEAT), help={'speed': "Speed of wave effect: 0-255"}),
+        Command('pattern', "Display pattern", (PATTERN, REPEAT)),
+        Command('off', "Turn off", ())
+    )
+}
+
+
+def bind(handle):
+    """Map command names to the methods of a device (or anything with the same methods)."""
+
+    return {name: getattr(handle, command.method) for name, command in COMMANDS.items()}
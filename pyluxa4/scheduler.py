@@ -1,8 +1,15 @@
 """Scheduler."""
 import time
-import copy
-from datetime import datetime
+import heapq
+import itertools
+import json
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
 from . import common as cmn
+from . import registry
+from .timerwheel import TimerWheel
+from .cron import Cron
 
 MON = 0
 TUE = 1
@@ -28,168 +35,251 @@ DAY_MAP = {
     "all": ALL
 }
 
+# Bit mask of days where bit 0 is Monday.
+ALL_DAYS = 0x7f
+
+# Seconds in a day without a daylight saving change.
+DAY_SECONDS = 24 * 60 * 60
+
+# Default window (in seconds) after an event's time in which the event is still allowed to fire.
+# Events that are discovered later than this (computer was sleeping, etc.) are skipped.
+WINDOW = 60
+
+# Resolution (in seconds) of timers.
+TIMER_RESOLUTION = 0.001
+
+# Maximum time (in seconds) to sleep between checks. Guards against wall clock changes
+# and system suspend, neither of which a monotonic sleep will notice.
+MAX_SLEEP = 60
+
+
+# Serialized schedule or timers at a given version.
+Snapshot = namedtuple('Snapshot', ('etag', 'version', 'json'))
+
+
+class Event:
+    """A compiled scheduler event."""
+
+    __slots__ = (
+        'id', 'entry', 'cmd', 'args', 'kwargs', 'days', 'offsets', 'times', 'cycles', 'increment', 'timer', 'end',
+        'cron', 'remaining', 'removed'
+    )
+
+    def __init__(
+        self, event_id, entry, cmd, args, kwargs, days, offsets, times, cycles, increment, timer, end, cron=None
+    ):
+        """Initialize."""
+
+        self.id = event_id
+        self.entry = entry
+        self.cmd = cmd
+        self.args = args
+        self.kwargs = kwargs
+        self.days = days
+        self.offsets = offsets
+        self.times = times
+        self.cycles = cycles
+        self.increment = increment
+        self.timer = timer
+        self.end = end
+        self.cron = cron
+        self.remaining = len(times)
+        self.removed = False
+
 
 class Scheduler:
     """Scheduler."""
 
-    def __init__(self, handle, logger):
+    def __init__(self, handle, logger, clock=time.time, window=WINDOW, on_expire=None):
         """Initialize."""
 
         self.logger = logger
+        # Called with the event when a timer expires.
+        self.on_expire = on_expire
         self.handle = handle
-        self.mode_map = {
-            "color": handle.color,
-            "strobe": handle.strobe,
-            "fade": handle.fade,
-            "wave": handle.wave,
-            "pattern": handle.pattern,
-            "off": handle.off
-        }
-        self.events = []
-        self.cmds = []
+        self.clock = clock
+        self.window = window
+        self.mode_map = registry.bind(handle)
+        # Events by ID, kept in the order they were added.
+        self.events = {}
+        self.timers = {}
+        self.ids = itertools.count(1)
+        # Priority queue of `(timestamp, sequence, event, time_index)` for scheduled events.
+        self.queue = []
+        self.sequence = itertools.count()
+        # Timing wheel of `(event_id, time_index)` for timers.
+        # A `time_index` of `None` marks the end of a timer.
+        self.wheel = TimerWheel(clock(), TIMER_RESOLUTION)
+        # Local midnights and weekdays for the week starting with the current day.
+        self.calendar = None
+        # Versions of the schedule (`False`) and timers (`True`) which are bumped on every change.
+        # The instance ID keeps versions from colliding across restarts.
+        self.instance = uuid.uuid4().hex[:12]
+        self.versions = {False: 0, True: 0}
+        self.snapshots = {}
+
+    def push(self, event, time_index, t):
+        """Queue a time slot of an event."""
+
+        if event.timer:
+            self.wheel.add((event.id, time_index), t)
+        else:
+            heapq.heappush(self.queue, (t, next(self.sequence), event, time_index))
+
+    def compact(self):
+        """Drop queue entries of removed events."""
+
+        self.queue = [entry for entry in self.queue if not entry[2].removed]
+        heapq.heapify(self.queue)
+
+    def remove(self, event_id):
+        """
+        Remove the event with the given ID.
+
+        Returns `False` if no event was found.
+        """
+
+        event = self.events.pop(event_id, None)
+        if event is None:
+            event = self.timers.pop(event_id, None)
+            if event is None:
+                return False
+            for index in range(len(event.times)):
+                self.wheel.remove((event_id, index))
+            self.wheel.remove((event_id, None))
+        # Entries still in the queue are dropped when they are popped.
+        event.removed = True
+        self.versions[event.timer] += 1
+        return True
 
     def clear_timers(self):
         """Clear the timers."""
 
-        remove = []
-        for index, event in enumerate(self.events):
-            timer = event.get('timer')
-            if timer is not None:
-                remove.append(index)
-
-        for index in reversed(remove):
-            del self.events[index]
-            del self.cmds[index]
+        for event in self.timers.values():
+            event.removed = True
+        self.timers = {}
+        self.wheel.clear(self.clock())
+        self.versions[True] += 1
 
     def clear_schedule(self):
         """Clear the schedule."""
 
-        remove = []
-        for index, event in enumerate(self.events):
-            timer = event.get('timer')
-            if timer is None:
-                remove.append(index)
-
-        for index in reversed(remove):
-            del self.events[index]
-            del self.cmds[index]
+        for event in self.events.values():
+            event.removed = True
+        self.events = {}
+        self.compact()
+        self.versions[False] += 1
 
-    def get_timer_increment(self, times):
+    def get_timer_increment(self, offsets):
         """Calculate timer increments."""
 
-        if not isinstance(times, list):
-            times = [times]
-
-        accum = 0
-        for t in times:
-            h, m = t.split(':')
-            accum += int(h) * 60 * 60 + int(m) * 60
+        accum = sum(offsets)
         if accum == 0:
             accum = 1
         return accum
 
-    def resolve_times(self, ref, times, timer=False):
+    def parse_time(self, value, timer=False):
         """
-        Resolve times.
-
-        Timers should relative the current time.
+        Parse a time string of the form `HH:MM` or `HH:MM:SS` into seconds.
 
-        Non-timers should be relative to the current day.
-        If a non-timer's time is less than the current time,
-        we should add a day.
+        Timer times are relative, so hours are not limited to a single day,
+        and seconds can have a fraction for millisecond precision (`0:00:01.500`).
         """
 
+        cmn.is_str('times', value)
+        parts = value.split(':')
+        if len(parts) not in (2, 3):
+            raise ValueError('Invalid time {}'.format(value))
+        h = int(parts[0])
+        m = int(parts[1])
+        sec = 0
+        if len(parts) == 3:
+            sec = round(float(parts[2]), 3) if timer else int(parts[2])
+        if h < 0 or not (0 <= m < 60) or not (0 <= sec < 60) or (not timer and h >= 24):
+            raise ValueError('Invalid time {}'.format(value))
+        return h * 60 * 60 + m * 60 + sec
+
+    def parse_times(self, times, timer=False):
+        """Parse a list of times into seconds."""
+
         if not isinstance(times, list):
             times = [times]
+        return tuple(self.parse_time(t, timer) for t in times)
+
+    def resolve_times(self, ref, offsets, timer=False, days=ALL_DAYS):
+        """
+        Resolve times.
+
+        Timers should relative the current time.
+
+        Non-timers should be relative to the current day. The first
+        occurrence on one of the given days, that is not already
+        outside the firing window, is used.
+        """
 
-        seconds = ref.timestamp()
         if timer:
             new_times = []
-            ts = ref.timestamp()
-            for t in times:
-                h, m = t.split(':')
-                new_times.append(ts + int(h) * 60 * 60 + int(m) * 60)
-                ts = new_times[-1]
+            ts = ref
+            for offset in offsets:
+                ts += offset
+                new_times.append(ts)
         else:
-            new_times = []
-            for t in times:
-                h, m = t.split(':')
-                dt = ref.replace(hour=int(h), minute=int(m), second=0, microsecond=0)
-                t = dt.timestamp()
-                if t < seconds:
-                    t += 24 * 60 * 60
-                new_times.append(dt.timestamp())
+            after = ref - self.window
+            new_times = [self.next_time(offset, days, after) for offset in offsets]
         return new_times
 
+    def get_calendar(self, t):
+        """
+        Get the week, starting on the day of the given time, as local midnights and weekdays.
+
+        Midnights are given both as timestamps (with one more for the end of the last day) and as naive local
+        `datetime` objects. The week is kept until the given time moves on to another day.
+        """
+
+        calendar = self.calendar
+        if calendar is None or not (calendar[0][0] <= t < calendar[0][1]):
+            day = datetime.fromtimestamp(t).replace(hour=0, minute=0, second=0, microsecond=0)
+            midnights = tuple(day + timedelta(days=i) for i in range(9))
+            stamps = tuple(midnight.timestamp() for midnight in midnights)
+            weekdays = tuple(1 << ((day.weekday() + i) % 7) for i in range(8))
+            calendar = self.calendar = (stamps, midnights, weekdays)
+        return calendar
+
+    def next_time(self, offset, days, after):
+        """Get the first time, on one of the given days, that is greater than `after`."""
+
+        stamps, midnights, weekdays = self.get_calendar(after)
+        for i in range(8):
+            if days & weekdays[i]:
+                midnight = stamps[i]
+                if stamps[i + 1] - midnight == DAY_SECONDS:
+                    t = midnight + offset
+                else:
+                    # Daylight saving time begins or ends today, let `datetime` find the wall clock time.
+                    t = (midnights[i] + timedelta(seconds=offset)).timestamp()
+                if t > after:
+                    return t
+        raise ValueError('No valid days found')
+
     def resolve_days(self, days):
         """
         Resolve days.
 
-        Days are numbers from 0-6 where Monday is 0.
+        Days are returned as a bit mask where Monday is bit 0.
         """
 
         if not isinstance(days, list):
             days = [days]
 
-        resolved = []
+        resolved = 0
         for day in days:
             value = DAY_MAP.get(day.lower())
             if value is not None:
-                resolved.extend(value)
+                for d in value:
+                    resolved |= 1 << d
         if not resolved:
             raise ValueError('No valid days found')
-        return set(resolved)
-
-    def parse_led(self, arguments, kwargs):
-        """Parse led."""
-
-        led = arguments.get('led', cmn.LED_ALL)
-        if isinstance(led, str):
-            led = cmn.resolve_led(led)
-        else:
-            cmn.validate_led(led)
-        kwargs['led'] = led
-
-    def parse_speed(self, arguments, kwargs):
-        """Parses speed."""
-
-        speed = arguments.get('speed', 0)
-        cmn.validate_speed(speed)
-        kwargs['speed'] = speed
-
-    def parse_repeat(self, arguments, kwargs):
-        """Parse repeat."""
-
-        repeat = arguments.get('repeat', 0)
-        cmn.validate_repeat(repeat)
-        kwargs['repeat'] = repeat
-
-    def parse_wave(self, arguments, kwargs):
-        """Parse wave."""
-
-        wave = arguments.get('wave', 1)
-        if isinstance(wave, str):
-            wave = cmn.resolve_wave(wave)
-        else:
-            cmn.validate_wave(wave)
-        kwargs['wave'] = wave
-
-    def parse_pattern(self, arguments, args):
-        """Parse pattern."""
-
-        pattern = arguments['pattern']
-        if isinstance(pattern, str):
-            pattern = cmn.resolve_pattern(pattern)
-        else:
-            cmn.validate_pattern(pattern)
-        args.append(pattern)
-
-    def parse_color(self, arguments, args):
-        """Parse colors."""
-
-        color = arguments['color']
-        cmn.is_str('color', color)
-        args.append(color)
+        return resolved
 
     def parse_timer(self, obj):
         """Parse timer."""
@@ -199,14 +289,13 @@ class Scheduler:
         cmn.validate_timer_cycle(timer)
         return timer
 
-    def parse_timer_boundary(self, ref, value, now):
+    def parse_timer_boundary(self, value, now):
         """Parse timer boundary."""
 
-        t = self.resolve_times(ref, [value], False)[0] if value is not None else None
+        if value is None:
+            return None
         # Time is already passed for today, assume tomorrow
-        if t is not None and t < now.timestamp():
-            t += 24 * 60 * 60
-        return t
+        return self.next_time(self.parse_time(value), ALL_DAYS, now)
 
     def read_schedule(self, records):
         """Read schedule."""
@@ -219,9 +308,8 @@ class Scheduler:
         err = ''
 
         events = []
-        cmds = []
 
-        now = datetime.now()
+        now = self.clock()
 
         for entry in records:
             start = None
@@ -231,6 +319,9 @@ class Scheduler:
                 if 'timer' in entry:
                     allowed.add('start')
                     allowed.add('end')
+                elif 'cron' in entry:
+                    # Cron expressions replace days and times
+                    allowed = set(['cmd', 'cron', 'args'])
                 # Throw an error for unexpected parameters
                 for k in entry.keys():
                     if k not in allowed:
@@ -241,55 +332,30 @@ class Scheduler:
                 # Handle timer variables
                 timer = self.parse_timer(entry) if 'timer' in entry else None
                 if timer is not None:
-                    start = self.parse_timer_boundary(now, entry.get('start'), now)
-                    end = self.parse_timer_boundary(now, entry.get('end'), now)
+                    start = self.parse_timer_boundary(entry.get('start'), now)
+                    end = self.parse_timer_boundary(entry.get('end'), now)
 
-                args = []
-                kwargs = {}
+                cron = None
                 if cmd_type in self.mode_map:
                     cmd = self.mode_map[cmd_type]
-                    if timer is not None:
-                        days = ALL
+                    if 'cron' in entry:
+                        cron = Cron(entry['cron'])
+                        days = ALL_DAYS
+                        offsets = ()
+                        times = [cron.next_time(now - self.window)]
                     else:
-                        days = self.resolve_days(entry['days'])
-                    times = self.resolve_times(
-                        (datetime.fromtimestamp(start) if start is not None else now),
-                        entry['times'],
-                        timer is not None
-                    )
-                    arguments = entry.get('args', {})
-                    expected = set()
-                    if cmd_type in ('color', 'strobe', 'fade', 'wave'):
-                        expected.add('color')
-                        self.parse_color(arguments, args)
-
-                        if cmd_type in ('color', 'strobe', 'fade'):
-                            expected.add('led')
-                            self.parse_led(arguments, kwargs)
-
-                        if cmd_type in ('strobe', 'fade', 'wave'):
-                            expected.add('speed')
-                            self.parse_speed(arguments, kwargs)
-
-                        if cmd_type in ('strobe', 'wave'):
-                            expected.add('repeat')
-                            self.parse_repeat(arguments, kwargs)
-
-                        if cmd_type == 'wave':
-                            expected.add('wave')
-                            self.parse_wave(arguments, kwargs)
-
-                    elif cmd_type == 'pattern':
-                        expected.add('pattern')
-                        expected.add('repeat')
-                        self.parse_pattern(arguments, args)
-                        self.parse_repeat(arguments, kwargs)
-
-                    # Throw an error for unexpected arguments
-                    for k in arguments.keys():
-                        if k not in expected:
-                            raise ValueError('Unexpected command argument {}'.format(k))
-
+                        if timer is not None:
+                            days = ALL_DAYS
+                        else:
+                            days = self.resolve_days(entry['days'])
+                        offsets = self.parse_times(entry['times'], timer is not None)
+                        times = self.resolve_times(
+                            (start if start is not None else now),
+                            offsets,
+                            timer is not None,
+                            days
+                        )
+                    args, kwargs = registry.COMMANDS[cmd_type].parse(entry.get('args', {}), strict=True)
                 else:
                     raise ValueError("Unrecognized command {}".format(cmd_type))
 
@@ -297,168 +363,211 @@ class Scheduler:
                 err = str(e)
                 break
 
-            events.append(entry)
-            cmds.append(
-                {
-                    'cmd': cmd,
-                    'args': args,
-                    'kwargs': kwargs,
-                    'days': days,
-                    'times': times,
-                    'cycles': None if timer is None else [timer] * len(entry['times']),
-                    'increment': 1 if timer is None else self.get_timer_increment(entry['times']),
-                    'timer': timer is not None,
-                    'start': start,
-                    'end': end
-                }
+            events.append(
+                Event(
+                    None,
+                    entry,
+                    cmd,
+                    args,
+                    kwargs,
+                    days,
+                    offsets,
+                    times,
+                    None if timer is None else [timer] * len(times),
+                    1 if timer is None else self.get_timer_increment(offsets),
+                    timer is not None,
+                    end,
+                    cron
+                )
             )
         if not err:
-            self.events.extend(events)
-            self.cmds.extend(cmds)
+            for event in events:
+                event.id = next(self.ids)
+                if event.timer:
+                    self.timers[event.id] = event
+                else:
+                    self.events[event.id] = event
+                for index, t in enumerate(event.times):
+                    self.push(event, index, t)
+                if event.end is not None:
+                    self.push(event, None, event.end)
+                self.versions[event.timer] += 1
 
         return err
 
     def get_schedule(self):
-        """Get the schedule."""
+        """Get a copy of the schedule."""
 
-        records = []
-        for event in self.events:
-            timer = event.get('timer')
-            if timer is None:
-                records.append(copy.deepcopy(event))
-        return records
+        # Decoding the snapshot makes a copy the caller is free to change far quicker than `deepcopy`.
+        return json.loads(self.get_snapshot().json)
 
     def get_timers(self):
-        """Get the timers."""
+        """Get a copy of the timers."""
 
-        records = []
-        for event in self.events:
-            timer = event.get('timer')
-            if timer is not None:
-                records.append(copy.deepcopy(event))
-        return records
+        return json.loads(self.get_snapshot(True).json)
 
-    def time_expired(self, now, target):
-        """Check if target past any usable range."""
+    def get_snapshot(self, timers=False):
+        """
+        Get a serialized snapshot of the schedule or timers.
+
+        The snapshot is only rebuilt when the schedule or timers change.
+        """
 
-        return target is None or (now >= target and (now - target) >= 60)
+        version = self.versions[timers]
+        snapshot = self.snapshots.get(timers)
+        if snapshot is None or snapshot.version != version:
+            events = self.timers if timers else self.events
+            snapshot = Snapshot(
+                '{}-{}{}'.format(self.instance, 't' if timers else 's', version),
+                version,
+                json.dumps([event.entry for event in events.values()])
+            )
+            self.snapshots[timers] = snapshot
+        return snapshot
 
-    def time_in_range(self, now, target, day, days):
-        """Evaluate if time is in range."""
+    def time_expired(self, now, target):
+        """Check if target past any usable range."""
 
-        return target is not None and now >= target and day in days and (now - target) < 60
+        return target is None or (now >= target and (now - target) >= self.window)
 
-    def update_timer(self, cmd, event_index, time_index, dt_now, expired):
-        """Update a timer."""
+    def update_timer(self, event, time_index, now):
+        """
+        Update a timer.
 
-        timer_expired = False
-        t = cmd['times'][time_index]
+        Return the next time of the slot, or `None` if the slot has run its cycles.
+        """
 
-        if t is not None:
-            cycle = cmd['cycles'][time_index]
-            increment = cmd['increment']
-            now = dt_now.timestamp()
-            cycles = 0
+        t = event.times[time_index]
+        cycle = event.cycles[time_index]
+        increment = event.increment
+        cycles = 0
 
-            while t < now:
+        if t <= now:
+            # Count all the increments that have passed, including any missed while the computer was asleep.
+            cycles = int((now - t) // increment) + 1
+            t += cycles * increment
+            if t <= now:
                 t += increment
                 cycles += 1
 
-            if cycle == 0:
-                cmd['times'][time_index] = t
-            elif cycles < cycle:
-                cmd['cycles'][time_index] -= cycles
-                cmd['times'][time_index] = t
-            else:
-                cmd['times'][time_index] = None
-
-        if cmd['times'][-1] is None:
-            # All time slots have expired
-            timer_expired = True
-            expired.append(event_index)
+        if cycle == 0:
+            event.times[time_index] = t
+        elif cycles < cycle:
+            event.cycles[time_index] -= cycles
+            event.times[time_index] = t
+        else:
+            event.times[time_index] = None
+            event.remaining -= 1
 
-        return timer_expired
+        return event.times[time_index]
 
-    def update_time(self, cmd, event_index, time_index, dt_now):
+    def update_time(self, event, time_index, now):
         """Update a normal event time."""
 
-        times = self.events[event_index]['times']
-        t = cmd['times'][time_index]
-        t2 = self.resolve_times(dt_now, times[time_index] if isinstance(times, list) else times, False)[0]
-        if t2 == t:
-            # We haven't rolled over to a new day, so we calculated the same time.
-            # Add a day.
-            t2 += 24 * 60 * 60
-        cmd['times'][time_index] = t2
-
-    def update_times(self, cmd, index, dt_now, expired):
-        """Update any times that have expired."""
-
-        timer_expired = False
-        now = dt_now.timestamp()
-        # Update expired times if required
-        for i, t in enumerate(cmd['times']):
-            if self.time_expired(now, t):
-                is_timer = cmd['timer']
-                if is_timer:
-                    timer_expired = self.update_timer(cmd, index, i, dt_now, expired)
-                    break
-                else:
-                    self.update_time(cmd, index, i, dt_now)
+        if event.cron is not None:
+            t = event.cron.next_time(now)
+        else:
+            t = self.next_time(event.offsets[time_index], event.days, now)
+        event.times[time_index] = t
+        return t
 
-        return timer_expired
+    def due_time(self):
+        """
+        Return the timestamp at which the scheduler should be checked next.
 
-    def check_records(self):
-        """Check events."""
+        Returns `None` if there is nothing queued.
+        """
 
-        indexes = []
-        timers = []
-        expired = []
+        queue = self.queue
+        while queue and queue[0][2].removed:
+            heapq.heappop(queue)
+        due = queue[0][0] if queue else None
+        wheel_due = self.wheel.next_due()
+        if wheel_due is not None and (due is None or wheel_due < due):
+            due = wheel_due
+        return due
 
-        now = time.time()
-        dt_now = datetime.fromtimestamp(now)
-        day = dt_now.weekday()
+    def next_due(self):
+        """
+        Return the number of seconds until the scheduler should be checked next.
 
-        for index, cmd in enumerate(self.cmds):
+        Returns `None` if there is nothing queued.
+        """
+
+        due = self.due_time()
+        if due is None:
+            return None
+        return min(max(due - self.clock(), 0), MAX_SLEEP)
+
+    def expire(self, event):
+        """Remove an expired timer."""
 
-            if cmd['timer'] and cmd['start'] is not None:
-                if now < cmd['start']:
-                    continue
-                # Okay to start timer
-                cmd['start'] = None
+        self.remove(event.id)
+        if self.on_expire is not None:
+            self.on_expire(event)
 
-            if cmd['timer'] and cmd['start'] is None and cmd['end'] is not None:
-                if now >= cmd['end']:
-                    expired.append(index)
-                    continue
+    def check_timer(self, event, index, now, fire):
+        """Check an expired timer slot."""
 
-            # We don't know if the computer just woke up and all are times are bad.
-            # Refresh stale times.
-            if self.update_times(cmd, index, dt_now, expired):
-                # We found an timer which is completely expired. No need to explore this entry further.
+        if index is None:
+            # Timer has hit its end time.
+            self.expire(event)
+            return
+
+        t = event.times[index]
+        if event.end is not None and t >= event.end:
+            self.expire(event)
+            return
+
+        if not self.time_expired(now, t):
+            fire.append(event)
+        t = self.update_timer(event, index, now)
+        if t is not None:
+            self.push(event, index, t)
+        elif not event.remaining:
+            # All time slots have expired
+            self.expire(event)
+
+    def get_due(self):
+        """
+        Get the events that are due to run.
+
+        Only events whose time has come are popped off the queue or expired from the timing wheel.
+        Events that are found too late to fire are rescheduled. Scheduled events are returned
+        before timers.
+        """
+
+        fire = []
+
+        now = self.clock()
+        queue = self.queue
+
+        while queue and queue[0][0] <= now:
+            t, _, event, index = heapq.heappop(queue)
+            if event.removed:
                 continue
+            if not self.time_expired(now, t):
+                fire.append(event)
+            self.push(event, index, self.update_time(event, index, now))
 
-            # Capture events whose time we match.
-            for i, t in enumerate(cmd['times']):
-                if self.time_in_range(now, t, day, cmd['days']):
-                    if cmd['timer']:
-                        timers.append(index)
-                        self.update_timer(cmd, index, i, dt_now, expired)
-                    else:
-                        indexes.append(index)
-                        self.update_time(cmd, index, i, dt_now)
+        timers = self.timers
+        for event_id, index in self.wheel.advance(now):
+            event = timers.get(event_id)
+            if event is not None:
+                self.check_timer(event, index, now, fire)
 
-        indexes.extend(timers)
+        return fire
 
-        # Run the matched event
-        for index in indexes:
-            cmd = self.cmds[index]
+    def execute(self, events):
+        """Run the given events."""
+
+        for event in events:
             try:
-                cmd['cmd'](*cmd['args'], **cmd['kwargs'])
+                event.cmd(*event.args, **event.kwargs)
             except Exception as e:
                 self.logger.error(e)
 
-        # Remove expired timers
-        for index in reversed(expired):
-            del self.cmds[index]
-            del self.events[index]
+    def check_records(self):
+        """Check events and run the ones that are due."""
+
+        self.execute(self.get_due())
@@ -1,29 +1,194 @@
 """Luxafor server."""
+import json
 import logging
-from flask import Flask, jsonify, abort, make_response, request
+import os
+import socket
+import stat
+import itertools
+import functools
+import contextlib
+import time
+from collections import OrderedDict
+from flask import Flask, Response, jsonify, abort, make_response, request, g
 from flask_httpauth import HTTPTokenAuth
 from gevent.pywsgi import WSGIServer
 from gevent.lock import BoundedSemaphore
+from gevent.event import Event
+from gevent.queue import Queue, Full
+from gevent.threadpool import ThreadPool
 import gevent
+import gevent.socket
+from . import broadcast
+from . import metrics
+from . import registry
 from . import scheduler
+from . import stream
+from . import tracing
+from . import udp
 from . import usb
 from . import common as cmn
 from . import __meta__
 
-sem = BoundedSemaphore(1)
+# Guards access to the scheduler
+schedule_sem = BoundedSemaphore(1)
+schedule_changed = Event()
 
 logger = logging.getLogger(__name__)
 log_handler = logging.StreamHandler()
 logger.addHandler(log_handler)
 logger.setLevel(logging.INFO)
 app = Flask(__name__)
-auth = HTTPTokenAuth('Bearer')
+
+
+class LocalTokenAuth(HTTPTokenAuth):
+    """Token authentication that trusts requests made over the Unix domain socket."""
+
+    def authenticate(self, auth, stored_password):
+        """Authenticate."""
+
+        # Access to the socket is already restricted by its file permissions.
+        if request.environ.get(UNIX_SOCKET_ENV):
+            return True
+        return super().authenticate(auth, stored_password)
+
+
+auth = LocalTokenAuth('Bearer')
 tokens = set()
-luxafor = None
+# Devices by serial number, and the device used by routes that do not name one
+devices = {}
+default_device = None
 schedule = None
+async_commands = False
+color_stream = None
+udp_listener = None
+unix_server = None
+# Where to emit request timing spans: `header`, `log`, `both`, or `None` to disable tracing.
+trace_mode = None
+broadcaster = broadcast.Broadcaster()
+# Timers that expired during the last scheduler check
+expired = []
 HOST = '0.0.0.0'
 PORT = 5000
+# WSGI environment key marking requests that came in over the Unix domain socket
+UNIX_SOCKET_ENV = 'pyluxa4.unix_socket'
+QUEUE_SIZE = 64
+# Threads for each device's I/O: one for commands (which hold the device lock) and one for the calls that do not
+IO_THREADS = 2
+HISTORY_SIZE = 1024
+# `<command>` URL values that get their own request latency series, anything else is counted as `other`.
+LATENCY_COMMANDS = frozenset(registry.COMMANDS) | {'schedule', 'timers'}
 ERR_CMD_FAILED = "Command could not be excuted, possibly due to a disconnected device"
+ERR_QUEUE_FULL = "Command queue is full"
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Command:
+    """A command waiting to be, or that has been, sent to the device."""
+
+    __slots__ = ('id', 'func', 'args', 'kwargs', 'state', 'error', 'results')
+
+    def __init__(self, command_id, func, args, kwargs, results=None):
+        """Initialize."""
+
+        self.id = command_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.state = QUEUED
+        self.error = ''
+        # Results of each command in a batch, filled in as the batch runs.
+        self.results = results
+
+
+class CommandQueue:
+    """
+    Bounded queue of commands for a device.
+
+    Commands are sent to the device one at a time by a single writer greenlet (`run`).
+    The state of the most recent commands is kept so they can be looked up by ID.
+    """
+
+    def __init__(self, lock, maxsize=QUEUE_SIZE, history=HISTORY_SIZE):
+        """Initialize."""
+
+        self.lock = lock
+        self.queue = Queue(maxsize)
+        self.history = history
+        self.commands = OrderedDict()
+        self.ids = itertools.count(1)
+
+    def put(self, func, args=(), kwargs=None, block=True, results=None):
+        """
+        Queue a command.
+
+        Raises `gevent.queue.Full` if `block` is disabled and the queue is full.
+        """
+
+        command = Command(next(self.ids), func, args, {} if kwargs is None else kwargs, results)
+        self.queue.put(command, block)
+        metrics.QUEUED.inc()
+        self.commands[command.id] = command
+        if len(self.commands) > self.history:
+            self.commands.popitem(last=False)
+        return command
+
+    def get(self, command_id):
+        """Get a command by ID."""
+
+        return self.commands.get(command_id)
+
+    def run(self):
+        """Send queued commands to the device."""
+
+        while True:
+            command = self.queue.get()
+            command.state = RUNNING
+            self.lock.acquire()
+            try:
+                if command.func(*command.args, **command.kwargs):
+                    raise RuntimeError(ERR_CMD_FAILED)
+                command.state = DONE
+            except Exception as e:
+                logger.error(e)
+                command.state = FAILED
+                command.error = str(e)
+            self.lock.release()
+
+
+class Device:
+    """A device with its own lock and command queue so devices do not wait on each other."""
+
+    def __init__(self, luxafor):
+        """Initialize."""
+
+        self.luxafor = luxafor
+        self.serial = luxafor.serial
+        self.lock = metrics.TimedLock(BoundedSemaphore(1), metrics.LOCK_WAIT)
+        self.commands = CommandQueue(self.lock)
+
+
+def add_device(luxafor):
+    """Add a device to the server."""
+
+    device = Device(luxafor)
+    luxafor.on_connection = functools.partial(publish_connection, device.serial)
+    devices[device.serial] = device
+    return device
+
+
+def get_device(serial=None):
+    """Get a device by serial number, or the default device."""
+
+    if serial is None:
+        return default_device
+    device = devices.get(serial)
+    if device is None:
+        abort(404)
+    return device
 
 
 def get_api_ver_path():
@@ -41,66 +206,72 @@ def verify_token(token):
     return False
 
 
-def color():
-    """Set colors."""
+def apply_command(func, *args, **kwargs):
+    """
+    Send a command to the device and publish it to event subscribers.
+
+    Raises an exception if the command fails. The caller must hold the device lock.
+    """
 
+    error = ''
     try:
-        error = ''
-        led = request.json.get("led", cmn.LED_ALL)
-        cmn.is_int('led', led)
-        color = request.json.get('color', '')
-        cmn.is_str('color', color)
+        with tracing.span('device'):
+            failed = func(*args, **kwargs)
+        if failed:
+            raise RuntimeError(ERR_CMD_FAILED)
     except Exception as e:
-        logger.error(e)
         error = str(e)
+        metrics.FAILURES.inc(func.__name__)
+        raise
+    finally:
+        broadcaster.publish('command', {"cmd": func.__name__, "args": args, "kwargs": kwargs, "error": error})
 
-    if not error:
-        sem.acquire()
-        try:
-            if luxafor.color(color, led=led):
-                raise RuntimeError(ERR_CMD_FAILED)
-        except Exception as e:
-            logger.error(e)
-            error = str(e)
-        sem.release()
 
-    if error:
-        abort(400, error)
+def queue_command(device, func, *args, results=None, **kwargs):
+    """
+    Queue a command and return a `202` with an ID that can be used to check on the command.
 
-    return jsonify(
-        {
-            "path": request.path,
-            "status": 'success',
-            "code": 200,
-            "error": error
-        }
+    `results` is an optional list the command fills in, which is returned when the command is checked on.
+    """
+
+    try:
+        command = device.commands.put(func, args, kwargs, block=False, results=results)
+    except Full:
+        abort(503, ERR_QUEUE_FULL)
+    return make_response(
+        jsonify(
+            {
+                "path": request.path,
+                "status": 'success',
+                "code": 202,
+                "id": command.id,
+                "state": command.state,
+                "error": ''
+            }
+        ),
+        202
     )
 
 
-def fade():
-    """Fade colors."""
+def send_command(device, func, *args, **kwargs):
+    """
+    Send a command to the device.
 
+    When the server runs commands asynchronously, the command is queued instead.
+    """
+
+    if async_commands:
+        return queue_command(device, apply_command, func, *args, **kwargs)
+
+    error = ''
+    with tracing.span('lock'):
+        device.lock.acquire()
     try:
-        error = ''
-        led = request.json.get("led", cmn.LED_ALL)
-        cmn.is_int('led', led)
-        color = request.json.get('color', '')
-        cmn.is_str('color', color)
-        speed = request.json.get('speed', 0)
-        cmn.is_int('speed', speed)
+        apply_command(func, *args, **kwargs)
     except Exception as e:
         logger.error(e)
         error = str(e)
-
-    if not error:
-        sem.acquire()
-        try:
-            if luxafor.fade(color, led=led, speed=speed):
-                raise RuntimeError(ERR_CMD_FAILED)
-        except Exception as e:
-            logger.error(e)
-            error = str(e)
-        sem.release()
+    device.lock.release()
 
     if error:
         abort(400, error)
@@ -115,144 +286,101 @@ def fade():
     )
 
 
-def strobe():
-    """Strobe colors."""
+def device_command(name, device):
+    """Validate and send a device command from the request."""
 
+    command = registry.COMMANDS[name]
     try:
         error = ''
-        led = request.json.get("led", cmn.LED_ALL)
-        cmn.is_int('led', led)
-        color = request.json.get('color', '')
-        cmn.is_str('color', color)
-        speed = request.json.get('speed', 0)
-        cmn.is_int('speed', speed)
-        repeat = request.json.get('repeat', 0)
-        cmn.is_int('repeat', repeat)
+        with tracing.span('parse'):
+            arguments = request.json if command.fields else {}
+        with tracing.span('validate'):
+            args, kwargs = command.parse(arguments)
     except Exception as e:
         logger.error(e)
         error = str(e)
 
-    if not error:
-        sem.acquire()
-        try:
-            if luxafor.strobe(color, led=led, speed=speed, repeat=repeat):
-                raise RuntimeError(ERR_CMD_FAILED)
-        except Exception as e:
-            logger.error(e)
-            error = str(e)
-        sem.release()
-
     if error:
         abort(400, error)
 
-    return jsonify(
-        {
-            "path": request.path,
-            "status": 'success',
-            "code": 200,
-            "error": error
-        }
-    )
+    return send_command(device, getattr(device.luxafor, command.method), *args, **kwargs)
 
 
-def wave():
-    """Wave colors."""
+def parse_batch(batch, device):
+    """Validate a batch of commands and return a list of `(cmd, func, args, kwargs)`."""
 
-    try:
-        error = ''
-        color = request.json.get('color', '')
-        cmn.is_str('color', color)
-        wave = request.json.get('wave', cmn.WAVE_SHORT)
-        cmn.is_int('wave', wave)
-        speed = request.json.get('speed', 0)
-        cmn.is_int('speed', speed)
-        repeat = request.json.get('repeat', 0)
-        cmn.is_int('repeat', repeat)
-    except Exception as e:
-        logger.error(e)
-        error = str(e)
+    if not isinstance(batch, list):
+        raise TypeError('Batch must be a list of commands')
 
-    if not error:
-        sem.acquire()
+    parsed = []
+    for index, item in enumerate(batch):
         try:
-            if luxafor.wave(color, wave=wave, speed=speed, repeat=repeat):
-                raise RuntimeError(ERR_CMD_FAILED)
+            if not isinstance(item, dict):
+                raise TypeError('Command must be an object')
+            cmd = item.get('cmd', '')
+            cmn.is_str('cmd', cmd)
+            command = registry.COMMANDS.get(cmd)
+            if command is None:
+                raise ValueError('{} is not a valid command'.format(cmd))
+            args, kwargs = command.parse(item.get('args', {}))
+            parsed.append((cmd, getattr(device.luxafor, command.method), args, kwargs))
         except Exception as e:
-            logger.error(e)
-            error = str(e)
-        sem.release()
-
-    if error:
-        abort(400, error)
+            raise ValueError('Command {}: {}'.format(index, e))
+    return parsed
 
-    return jsonify(
-        {
-            "path": request.path,
-            "status": 'success',
-            "code": 200,
-            "error": error
-        }
-    )
 
+def run_batch(batch, results):
+    """
+    Run a parsed batch of commands, appending a result for each to `results`.
 
-def pattern():
-    """Set pattern."""
+    Returns `True` if any of the commands failed. The caller must hold the device lock.
+    """
 
-    try:
+    failed = False
+    for cmd, func, args, kwargs in batch:
         error = ''
-        pattern = request.json.get('pattern', 0)
-        cmn.is_int('pattern', pattern)
-        repeat = request.json.get('repeat', 0)
-        cmn.is_int('repeat', repeat)
-    except Exception as e:
-        logger.error(e)
-        error = str(e)
-
-    if not error:
-        sem.acquire()
         try:
-            if luxafor.pattern(pattern, repeat=repeat):
-                raise RuntimeError(ERR_CMD_FAILED)
+            apply_command(func, *args, **kwargs)
         except Exception as e:
             logger.error(e)
             error = str(e)
-        sem.release()
+            failed = True
+        results.append({"cmd": cmd, "status": 'fail' if error else 'success', "error": error})
+    return failed
 
-    if error:
-        abort(400, error)
 
-    return jsonify(
-        {
-            "path": request.path,
-            "status": 'success',
-            "code": 200,
-            "error": error
-        }
-    )
+def batch_commands(device):
+    """Validate a batch of commands and send them to the device together."""
 
-
-def off():
-    """Set off."""
-
-    error = ''
-    sem.acquire()
     try:
-        if luxafor.off():
-            raise RuntimeError(ERR_CMD_FAILED)
+        error = ''
+        with tracing.span('parse'):
+            batch = request.json
+        with tracing.span('validate'):
+            batch = parse_batch(batch, device)
     except Exception as e:
         logger.error(e)
         error = str(e)
-    sem.release()
 
     if error:
         abort(400, error)
 
+    results = []
+    if async_commands:
+        return queue_command(device, run_batch, batch, results, results=results)
+
+    with tracing.span('lock'):
+        device.lock.acquire()
+    run_batch(batch, results)
+    device.lock.release()
+
     return jsonify(
         {
             "path": request.path,
             "status": 'success',
             "code": 200,
-            "error": error
+            "results": results,
+            "error": ''
         }
     )
 
@@ -264,7 +392,17 @@ def kill():
         error = ''
         http_server.close()
         http_server.stop(timeout=10)
+        if unix_server is not None:
+            unix_server.close()
+            unix_server.stop(timeout=10)
         background.kill()
+        gevent.killall(writers)
+        if color_stream is not None:
+            color_stream.stop(timeout=10)
+        if udp_listener is not None:
+            udp_listener.stop(timeout=10)
+        if streamer is not None:
+            streamer.kill()
     except Exception as e:
         logger.error(e)
         error = str(e)
@@ -281,28 +419,35 @@ def kill():
 
 
 def get_records(timers=False):
-    """Return the current schedule or timers from the scheduler."""
+    """
+    Return the current schedule or timers from the scheduler.
 
-    sem.acquire()
-    if timers:
-        report = schedule.get_timers()
+    The records are serialized once per change of the schedule, and clients
+    that send the current `ETag` via `If-None-Match` get a `304`.
+    """
+
+    schedule_sem.acquire()
+    snapshot = schedule.get_snapshot(timers)
+    schedule_sem.release()
+
+    if snapshot.etag in request.if_none_match:
+        response = make_response('', 304)
     else:
-        report = schedule.get_schedule()
-    sem.release()
-    return {
-        "path": request.path,
-        "status": 'success',
-        "code": 200,
-        "schedule": report,
-        "error": ''
-    }
+        response = make_response(
+            '{"path": %s, "status": "success", "code": 200, "schedule": %s, "error": ""}' % (
+                json.dumps(request.path), snapshot.json
+            )
+        )
+        response.mimetype = 'application/json'
+    response.set_etag(snapshot.etag)
+    return response
 
 
 def setup_schedule():
     """Setup schedule."""
 
     err = ''
-    sem.acquire()
+    schedule_sem.acquire()
     events = request.json.get('schedule')
     clear = request.json.get('clear', False)
     cancel = request.json.get('cancel', False)
@@ -312,7 +457,9 @@ def setup_schedule():
         schedule.clear_schedule()
     if events is not None:
         err = schedule.read_schedule(events)
-    sem.release()
+    schedule_sem.release()
+    # Wake the scheduler so it can recalculate when the next event is due.
+    schedule_changed.set()
     if err:
         abort(400, err)
     return {
@@ -324,13 +471,78 @@ def setup_schedule():
 
 
 def check_schedule():
-    """Check schedule in the background."""
+    """Check schedule in the background and queue the commands that are due."""
 
     while True:
-        sem.acquire()
-        schedule.check_records()
-        sem.release()
-        gevent.sleep(10)
+        schedule_sem.acquire()
+        start = time.perf_counter()
+        due = schedule.get_due()
+        metrics.SCHEDULER_TICK.time(start)
+        timeout = schedule.next_due()
+        schedule_sem.release()
+        for event in due:
+            broadcaster.publish('schedule', {"id": event.id, "timer": event.timer, "cmd": event.entry['cmd']})
+            default_device.commands.put(apply_command, (event.cmd,) + tuple(event.args), event.kwargs)
+        for event in expired:
+            broadcaster.publish('expire', {"id": event.id, "cmd": event.entry['cmd']})
+        expired.clear()
+        # Sleep until the next event is due or the schedule is changed.
+        # The timeout is measured by the event loop's monotonic clock.
+        schedule_changed.wait(timeout)
+        schedule_changed.clear()
+
+
+def timer_expired(event):
+    """Note an expired timer so it can be published after the commands that are due."""
+
+    expired.append(event)
+
+
+def publish_connection(serial, connected):
+    """Publish a device connection change."""
+
+    broadcaster.publish('device', {"serial": serial, "connected": connected})
+
+
+@app.before_request
+def start_timer():
+    """Note when the request started, and start a trace if tracing is enabled."""
+
+    g.start = time.perf_counter()
+    if trace_mode:
+        tracing.start()
+
+
+@app.after_request
+def record_latency(response):
+    """Record how long the request took, and emit the trace if tracing is enabled."""
+
+    # Labels are limited to known commands, endpoints, and status classes so requests cannot add series.
+    if request.endpoint is not None and 'start' in g:
+        command = (request.view_args or {}).get('command')
+        if command is None:
+            command = request.endpoint
+        elif command not in LATENCY_COMMANDS:
+            command = 'other'
+        metrics.REQUEST_LATENCY.time(g.start, command, '{}xx'.format(response.status_code // 100))
+
+    trace = tracing.stop() if trace_mode else None
+    if trace is not None:
+        total = trace.total()
+        if trace_mode in ('header', 'both'):
+            response.headers['Server-Timing'] = trace.server_timing(total)
+        if trace_mode in ('log', 'both'):
+            logger.info(
+                json.dumps(
+                    {
+                        "path": request.path,
+                        "code": response.status_code,
+                        "spans": {name: round(d * 1e3, 3) for name, d in trace.spans.items()},
+                        "total": round(total * 1e3, 3)
+                    }
+                )
+            )
+    return response
 
 
 @app.route('/')
@@ -350,18 +562,8 @@ def index():
 def execute_command(command):
     """Executes a given command GET or POST command."""
     if request.method == 'POST':
-        if command == 'color':
-            results = color()
-        elif command == 'fade':
-            results = fade()
-        elif command == 'strobe':
-            results = strobe()
-        elif command == 'wave':
-            results = wave()
-        elif command == 'pattern':
-            results = pattern()
-        elif command == 'off':
-            results = off()
+        if command in registry.COMMANDS:
+            results = device_command(command, get_device())
         elif command == 'kill':
             # Results won't make it back if successful
             results = kill()
@@ -375,6 +577,55 @@ def execute_command(command):
     return results
 
 
+@app.route('%s/commands' % get_api_ver_path(), methods=['POST'])
+@auth.login_required
+def execute_commands():
+    """Execute a batch of commands."""
+
+    return batch_commands(get_device())
+
+
+@app.route('%s/devices' % get_api_ver_path(), methods=['GET'])
+@auth.login_required
+def get_devices():
+    """List the devices."""
+
+    return jsonify(
+        {
+            "path": request.path,
+            "status": 'success',
+            "code": 200,
+            "devices": [
+                {
+                    "serial": device.serial,
+                    "default": device is default_device,
+                    "connected": device.luxafor.connected()
+                } for device in devices.values()
+            ],
+            "error": ''
+        }
+    )
+
+
+@app.route('%s/device/<string:serial>/command/<string:command>' % get_api_ver_path(), methods=['POST'])
+@auth.login_required
+def execute_device_command(serial, command):
+    """Execute a command on a specific device."""
+
+    device = get_device(serial)
+    if command not in registry.COMMANDS:
+        abort(404)
+    return device_command(command, device)
+
+
+@app.route('%s/device/<string:serial>/commands' % get_api_ver_path(), methods=['POST'])
+@auth.login_required
+def execute_device_commands(serial):
+    """Execute a batch of commands on a specific device."""
+
+    return batch_commands(get_device(serial))
+
+
 @app.route('%s/scheduler/<string:command>' % get_api_ver_path(), methods=['GET'])
 @auth.login_required
 def get_scheduler(command):
@@ -393,6 +644,49 @@ def get_scheduler(command):
     return results
 
 
+@app.route('%s/events' % get_api_ver_path(), methods=['GET'])
+@auth.login_required
+def get_events():
+    """Stream server events to the client as Server-Sent Events."""
+
+    return Response(
+        broadcaster.stream(broadcaster.subscribe()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('%s/queue/<int:command_id>' % get_api_ver_path(), methods=['GET'])
+@app.route('%s/device/<string:serial>/queue/<int:command_id>' % get_api_ver_path(), methods=['GET'])
+@auth.login_required
+def get_command(command_id, serial=None):
+    """Get the state of a queued command."""
+
+    command = get_device(serial).commands.get(command_id)
+    if command is None:
+        abort(404)
+
+    response = {
+        "path": request.path,
+        "status": 'success',
+        "code": 200,
+        "id": command.id,
+        "state": command.state,
+        "error": command.error
+    }
+    if command.results is not None:
+        response["results"] = command.results
+    return jsonify(response)
+
+
+@app.route('/metrics', methods=['GET'])
+@auth.login_required
+def get_metrics():
+    """Get metrics in the Prometheus text exposition format."""
+
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/pyluxa4/api/version', methods=['GET'])
 def version():
     """Return version."""
@@ -440,6 +734,23 @@ def not_found(error):
     )
 
 
+@app.errorhandler(503)
+def unavailable(error):
+    """Return 503 error."""
+
+    return make_response(
+        jsonify(
+            {
+                "path": request.path,
+                "status": "fail",
+                "code": 503,
+                "error": str(error)
+            }
+        ),
+        503
+    )
+
+
 @app.errorhandler(500)
 def server_error(error):
     """Return 500 error."""
@@ -456,37 +767,110 @@ def server_error(error):
     )
 
 
+def unix_listener(stack, path):
+    """Listen on a Unix domain socket that only the current user can connect to."""
+
+    # Clean up a socket left behind by a server that did not exit cleanly, but never anything else.
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise ValueError('{} exists and is not a socket'.format(path))
+        os.remove(path)
+    listener = gevent.socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stack.callback(listener.close)
+    listener.bind(path)
+    stack.callback(os.remove, path)
+    os.chmod(path, 0o600)
+    listener.listen(128)
+    return listener
+
+
+def open_devices(stack, device_index, device_path, all_devices):
+    """Open the requested device, and every other device if `all_devices` is enabled."""
+
+    # Device I/O blocks in C, so it runs on threads to keep the server responsive during long commands and reconnects.
+    # Each device gets threads of its own, so however many devices there are, a slow one never holds up the others.
+    def executor():
+        """Create the threads for a device's I/O."""
+
+        pool = ThreadPool(IO_THREADS)
+        stack.callback(pool.kill)
+        return pool.apply
+
+    io = executor()
+    lf = stack.enter_context(usb.Luxafor(device_index, device_path, executor=io))
+    opened = [lf]
+    if all_devices:
+        for d in io(usb.enumerate_luxafor):
+            if d['path'] != lf._path:
+                opened.append(stack.enter_context(usb.Luxafor(path=d['path'], executor=executor())))
+    return opened
+
+
 def run(
     host=HOST, port=PORT, device_index=0, device_path=None, token=None, events=None,
-    debug=False, **kwargs
+    debug=False, window=scheduler.WINDOW, async_mode=False, stream_port=None,
+    trace=None, all_devices=False, udp_port=None, unix_socket=None, **kwargs
 ):
     """Run server."""
 
-    global luxafor
+    global default_device
     global http_server
+    global unix_server
     global tokens
     global schedule
     global background
+    global writers
+    global async_commands
+    global color_stream
+    global udp_listener
+    global trace_mode
+    global streamer
 
     log_handler.setFormatter(
         logging.Formatter(fmt='[%(asctime)s] %(levelname)s: %(message)s', datefmt="%Y-%m-%d %H:%M:%S")
     )
 
-    with usb.Luxafor(device_index, device_path) as lf:
-        luxafor = lf
+    with contextlib.ExitStack() as stack:
+        opened = open_devices(stack, device_index, device_path, all_devices)
+        default_device = add_device(opened[0])
+        for lf in opened[1:]:
+            add_device(lf)
+        luxafor = default_device.luxafor
         tokens = set([token])
-        schedule = scheduler.Scheduler(luxafor, logger)
+        async_commands = async_mode
+        trace_mode = trace
+        schedule = scheduler.Scheduler(luxafor, logger, window=window, on_expire=timer_expired)
         if events is not None:
             err = schedule.read_schedule(events)
             if err:
                 logger.error(err)
         http_server = WSGIServer((host, port), app, **kwargs)
         serve = gevent.spawn(http_server.start)
+        if unix_socket is not None:
+            unix_server = WSGIServer(unix_listener(stack, unix_socket), app, environ={UNIX_SOCKET_ENV: True})
+            unix_server.start()
         background = gevent.spawn(check_schedule)
+        # One writer per device so commands to different devices do not wait on each other.
+        writers = [gevent.spawn(device.commands.run) for device in devices.values()]
+        greenlets = [serve, background] + writers
+        streamer = None
+        if stream_port is not None or udp_port is not None:
+            # Streamed frames and UDP commands share one coalescer so the latest update wins across both.
+            coalescer = stream.Coalescer(luxafor, default_device.lock, logger, broadcaster.publish)
+            streamer = gevent.spawn(coalescer.run)
+            greenlets.append(streamer)
+        if stream_port is not None:
+            color_stream = stream.ColorStream((host, stream_port), coalescer, verify_token, logger, **kwargs)
+            color_stream.start()
+        if udp_port is not None:
+            udp_listener = udp.UdpListener(
+                (host, udp_port), coalescer, token or '', logger, on_drop=metrics.UDP_DROPPED.inc
+            )
+            udp_listener.start()
 
         try:
-            logger.info('Starting Luxafor server...')
-            gevent.joinall([serve, background])
+            logger.info('Starting Luxafor server with {} device(s)...'.format(len(devices)))
+            gevent.joinall(greenlets)
         except KeyboardInterrupt:
             pass
         logger.info('Exiting Luxafor server...')
@@ -0,0 +1,94 @@
+"""
+Schedule simulator.
+
+Runs a schedule against a virtual clock so the commands it would send
+over a span of time can be seen without waiting for them.
+"""
+import logging
+from . import scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class VirtualClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self, now):
+        """Initialize."""
+
+        self.now = now
+
+    def __call__(self):
+        """Get the time."""
+
+        return self.now
+
+
+class Recorder:
+    """Device stand-in that records the commands sent to it."""
+
+    def __init__(self, clock):
+        """Initialize."""
+
+        self.clock = clock
+        self.commands = []
+
+    def record(self, cmd, args, kwargs):
+        """Record a command."""
+
+        self.commands.append((self.clock(), cmd, args, kwargs))
+        return False
+
+    def color(self, *args, **kwargs):
+        """Record color."""
+
+        return self.record('color', args, kwargs)
+
+    def fade(self, *args, **kwargs):
+        """Record fade."""
+
+        return self.record('fade', args, kwargs)
+
+    def strobe(self, *args, **kwargs):
+        """Record strobe."""
+
+        return self.record('strobe', args, kwargs)
+
+    def wave(self, *args, **kwargs):
+        """Record wave."""
+
+        return self.record('wave', args, kwargs)
+
+    def pattern(self, *args, **kwargs):
+        """Record pattern."""
+
+        return self.record('pattern', args, kwargs)
+
+    def off(self, *args, **kwargs):
+        """Record off."""
+
+        return self.record('off', args, kwargs)
+
+
+def simulate(records, start, end):
+    """
+    Simulate a schedule between the `start` and `end` timestamps.
+
+    Returns a list of `(timestamp, cmd, args, kwargs)` for every command that would run.
+    """
+
+    clock = VirtualClock(start)
+    recorder = Recorder(clock)
+    sched = scheduler.Scheduler(recorder, logger, clock)
+    err = sched.read_schedule(records)
+    if err:
+        raise ValueError(err)
+
+    while True:
+        sched.check_records()
+        due = sched.due_time()
+        if due is None or due > end:
+            break
+        clock.now = max(due, clock.now)
+
+    return recorder.commands
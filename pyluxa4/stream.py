@@ -0,0 +1,154 @@
+"""
+Color streaming.
+
+A persistent TCP connection for sending many color updates a second without
+paying for an HTTP request (and token check) on each one.
+
+The protocol is line based. The first line must authenticate the connection:
+
+```
+AUTH <token>
+```
+
+The server answers `OK` or `ERR <message>` (and closes the connection).
+Every following line is a frame of one or more `<led> <color>` pairs:
+
+```
+1 #ff0000 2 #00ff00 back blue
+```
+
+Frames are not acknowledged. Invalid frames are answered with `ERR <message>`
+and ignored. Updates are coalesced per LED: if the device falls behind, only
+the latest color for each LED is sent.
+"""
+from gevent.server import StreamServer
+from gevent.event import Event
+from . import usb
+from . import common as cmn
+
+LINE_LIMIT = 4096
+
+
+class Coalescer:
+    """Send commands to the device, keeping only the latest command for each LED."""
+
+    def __init__(self, device, lock, logger, publish=None):
+        """Initialize."""
+
+        self.device = device
+        self.lock = lock
+        self.logger = logger
+        # Optional callback to publish applied commands with.
+        self.publish = publish
+        self.pending = {}
+        self.ready = Event()
+
+    def set_color(self, led, color):
+        """Set the color of an LED, replacing any command still waiting to be sent to it."""
+
+        self.put(led, self.device.color, (color,), {'led': led})
+
+    def put(self, led, func, args, kwargs):
+        """Queue a command for an LED, replacing any command still waiting to be sent to it."""
+
+        if led == cmn.LED_ALL:
+            # Every pending command would be overwritten anyway.
+            self.pending.clear()
+        else:
+            # Move the LED to the end so it is applied after any pending `LED_ALL`.
+            self.pending.pop(led, None)
+        self.pending[led] = (func, args, kwargs)
+        self.ready.set()
+
+    def run(self):
+        """Send pending commands to the device."""
+
+        while True:
+            self.ready.wait()
+            self.ready.clear()
+            pending, self.pending = self.pending, {}
+            self.lock.acquire()
+            for func, args, kwargs in pending.values():
+                error = ''
+                try:
+                    if func(*args, **kwargs):
+                        raise RuntimeError('Command could not be excuted, possibly due to a disconnected device')
+                except Exception as e:
+                    self.logger.error(e)
+                    error = str(e)
+                if self.publish is not None:
+                    self.publish(
+                        'command', {"cmd": func.__name__, "args": list(args), "kwargs": kwargs, "error": error}
+                    )
+            self.lock.release()
+
+
+def parse_frame(line):
+    """Parse a frame into a list of `(led, color)`."""
+
+    parts = line.split()
+    if not parts or len(parts) % 2:
+        raise ValueError('Frames must be pairs of LED and color')
+
+    frame = []
+    for i in range(0, len(parts), 2):
+        led = cmn.resolve_led(parts[i])
+        color = '#{:02x}{:02x}{:02x}'.format(*usb.resolve_color(parts[i + 1]))
+        frame.append((led, color))
+    return frame
+
+
+class ColorStream:
+    """TCP server that accepts color frames and hands them to a `Coalescer`."""
+
+    def __init__(self, listener, coalescer, verify, logger, **kwargs):
+        """Initialize."""
+
+        self.coalescer = coalescer
+        self.verify = verify
+        self.logger = logger
+        self.server = StreamServer(listener, self.handle, **kwargs)
+
+    def start(self):
+        """Start the server."""
+
+        self.server.start()
+
+    def stop(self, timeout=None):
+        """Stop the server."""
+
+        self.server.stop(timeout)
+
+    def handle(self, sock, address):
+        """Handle a connection."""
+
+        f = sock.makefile('rwb')
+        try:
+            line = f.readline(LINE_LIMIT).decode('utf-8', 'replace').split(None, 1)
+            if len(line) != 2 or line[0].upper() != 'AUTH' or not self.verify(line[1].strip()):
+                f.write(b'ERR Unauthorized\n')
+                f.flush()
+                return
+            f.write(b'OK\n')
+            f.flush()
+
+            while True:
+                line = f.readline(LINE_LIMIT)
+                if not line:
+                    break
+                line = line.decode('utf-8', 'replace').strip()
+                if not line:
+                    continue
+                try:
+                    frame = parse_frame(line)
+                except Exception as e:
+                    f.write('ERR {}\n'.format(e).encode('utf-8'))
+                    f.flush()
+                    continue
+                for led, color in frame:
+                    self.coalescer.set_color(led, color)
+        except OSError as e:
+            self.logger.error(e)
+        finally:
+            f.close()
+            sock.close()
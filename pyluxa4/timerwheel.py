@@ -0,0 +1,199 @@
+"""
+Hierarchical timing wheel.
+
+Keys are placed in one of several wheels of slots depending on how far away
+their expiration is. As time advances, slots of the outer wheels are cascaded
+down into the inner wheels, and keys in the innermost wheel expire.
+
+Adding and removing keys is O(1). Each wheel keeps a bit mask of occupied slots,
+so empty slots (and whole rotations of empty wheels) are skipped without being
+visited. That keeps catching up after a long lapse in time (the computer sleeping)
+proportional to the number of keys instead of the time that has passed.
+"""
+import math
+
+BITS = 6
+SIZE = 1 << BITS
+MASK = SIZE - 1
+LEVELS = 4
+
+
+def lowest_bit(value):
+    """Get the index of the lowest set bit."""
+
+    return (value & -value).bit_length() - 1
+
+
+class TimerWheel:
+    """Hierarchical timing wheel."""
+
+    def __init__(self, now, resolution=1.0):
+        """Initialize."""
+
+        self.resolution = resolution
+        self.span = 1 << (BITS * LEVELS)
+        self.clear(now)
+
+    def __len__(self):
+        """Get the number of keys."""
+
+        return len(self.index)
+
+    def __contains__(self, key):
+        """Check if a key is in the wheel."""
+
+        return key in self.index
+
+    def clear(self, now):
+        """Remove all keys."""
+
+        # The next tick to process
+        self.current = self.to_tick(now)
+        self.slots = [[{} for _ in range(SIZE)] for _ in range(LEVELS)]
+        self.masks = [0] * LEVELS
+        self.index = {}
+
+    def to_tick(self, t):
+        """Convert a timestamp to a tick, rounding up so keys never expire early."""
+
+        return math.ceil(t / self.resolution)
+
+    def add(self, key, t):
+        """Add (or move) a key that should expire at the given timestamp."""
+
+        if key in self.index:
+            self.remove(key)
+        self.insert(key, self.to_tick(t))
+
+    def insert(self, key, tick):
+        """Insert a key into the slot for the given tick."""
+
+        delta = tick - self.current
+        if delta < 0:
+            # Already passed, expire on the next tick.
+            tick = self.current
+            delta = 0
+        elif delta >= self.span:
+            # Beyond the outer wheel, park it as far away as possible.
+            # It will be placed properly as it cascades.
+            delta = self.span - 1
+
+        level = 0
+        while delta >= (1 << (BITS * (level + 1))):
+            level += 1
+        slot = ((self.current + delta) >> (BITS * level)) & MASK
+
+        self.slots[level][slot][key] = tick
+        self.masks[level] |= 1 << slot
+        self.index[key] = (level, slot)
+
+    def remove(self, key):
+        """
+        Remove a key.
+
+        Returns `False` if the key was not found.
+        """
+
+        location = self.index.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        keys = self.slots[level][slot]
+        del keys[key]
+        if not keys:
+            self.masks[level] &= ~(1 << slot)
+        return True
+
+    def next_tick(self):
+        """
+        Get the next tick that needs attention.
+
+        The tick is either when keys expire or when keys need to be cascaded.
+        Returns `None` if the wheel is empty.
+        """
+
+        if not self.index:
+            return None
+
+        current = self.current
+        boundary = (current | MASK) + 1
+
+        mask = self.masks[0]
+        if mask:
+            m = mask >> (current & MASK)
+            if m:
+                return current + lowest_bit(m)
+            # Remaining keys belong to the next rotation.
+            return boundary
+
+        best = None
+        for level in range(1, LEVELS):
+            mask = self.masks[level]
+            if not mask:
+                continue
+            shift = BITS * level
+            # First block of this level that starts at or after the boundary
+            block = ((boundary - 1) >> shift) + 1
+            m = mask >> (block & MASK)
+            if m:
+                tick = (block + lowest_bit(m)) << shift
+            else:
+                # Remaining keys belong to the next rotation.
+                tick = ((block | MASK) + 1) << shift
+            if best is None or tick < best:
+                best = tick
+        return best
+
+    def move(self, tick):
+        """Move to the given tick and cascade the outer wheels if we are on their boundary."""
+
+        self.current = tick
+        if tick & MASK:
+            return
+
+        levels = 1
+        while levels < LEVELS - 1 and not (tick >> (BITS * levels)) & MASK:
+            levels += 1
+
+        # Cascade outer wheels first as they may cascade into the inner wheels.
+        for level in range(levels, 0, -1):
+            slot = (tick >> (BITS * level)) & MASK
+            keys = self.slots[level][slot]
+            if not keys:
+                continue
+            self.slots[level][slot] = {}
+            self.masks[level] &= ~(1 << slot)
+            for key, t in keys.items():
+                self.insert(key, t)
+
+    def advance(self, now):
+        """Advance the wheel to the given timestamp and return the keys that have expired."""
+
+        target = math.floor(now / self.resolution)
+        expired = []
+
+        while True:
+            tick = self.next_tick()
+            if tick is None or tick > target:
+                break
+            self.move(tick)
+            slot = tick & MASK
+            keys = self.slots[0][slot]
+            if keys:
+                self.slots[0][slot] = {}
+                self.masks[0] &= ~(1 << slot)
+                index = self.index
+                for key in keys:
+                    del index[key]
+                expired.extend(keys)
+                self.move(tick + 1)
+
+        if self.current <= target:
+            self.move(target + 1)
+        return expired
+
+    def next_due(self):
+        """Get the timestamp at which the wheel next needs attention, or `None` if it is empty."""
+
+        tick = self.next_tick()
+        return None if tick is None else tick * self.resolution
@@ -0,0 +1,102 @@
+"""
+Lightweight timing spans.
+
+A trace is started for the current context (each greenlet has its own), and code
+along the way records how long its steps take with `span`. When no trace has been
+started, `span` does nothing but return a shared no-op object.
+"""
+from contextvars import ContextVar
+import time
+
+current = ContextVar('pyluxa4_trace', default=None)
+
+
+class Trace:
+    """Total time spent in each named span, in the order they were first seen."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.start = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name, duration):
+        """Add time to a span."""
+
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def total(self):
+        """Get the time since the trace started."""
+
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total):
+        """Format the spans and the given total as a `Server-Timing` header value."""
+
+        spans = list(self.spans.items()) + [('total', total)]
+        return ', '.join('{};dur={:.3f}'.format(name, duration * 1e3) for name, duration in spans)
+
+
+class Span:
+    """Record the time spent in a block to a trace."""
+
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        """Initialize."""
+
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        """Enter."""
+
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, type, value, traceback):  # noqa: A002
+        """Exit."""
+
+        self.trace.add(self.name, time.perf_counter() - self.start)
+
+
+class NullSpan:
+    """Span that records nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        """Enter."""
+
+        return self
+
+    def __exit__(self, type, value, traceback):  # noqa: A002
+        """Exit."""
+
+
+NULL_SPAN = NullSpan()
+
+
+def start():
+    """Start a trace for the current context."""
+
+    trace = Trace()
+    current.set(trace)
+    return trace
+
+
+def stop():
+    """Stop the trace for the current context and return it."""
+
+    trace = current.get()
+    current.set(None)
+    return trace
+
+
+def span(name):
+    """Time a block in the current trace, if there is one."""
+
+    trace = current.get()
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name)
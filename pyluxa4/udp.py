@@ -0,0 +1,252 @@
+"""
+Binary UDP commands.
+
+A fire-and-forget path for sending commands with as little overhead as possible.
+Each datagram carries one command in the same layout as the USB report the device
+receives, authenticated with an HMAC keyed with the server's token:
+
+```
+Byte 0:      Protocol version: 1
+Byte 1-8:    Sender ID: 8 bytes chosen by the sender
+Byte 9-16:   Sequence number: unsigned 64 bit integer, big endian
+Byte 17-24:  USB report without the report number (command mode followed by its 7 bytes)
+Byte 25-40:  First 16 bytes of HMAC-SHA256 over bytes 0-24 using the token as the key
+```
+
+Sequence numbers must always increase for each sender ID; datagrams with a sequence
+number that is not greater than the last one accepted for the same sender ID are
+dropped. As the sender ID is signed, a datagram cannot be replayed under another ID,
+and the source address plays no part. This stops replays and means a late, out of order
+datagram can never replace a newer one.
+
+Only the most recently seen senders are remembered (`SENDERS`). When a sender is
+forgotten, its last sequence number raises a floor that the first datagram of any
+sender that is not remembered must be above, so forgetting a sender never lets its
+datagrams be replayed.
+
+`LuxUdp` picks a random sender ID and uses the time in microseconds as the sequence
+number, so senders do not need to keep track of sequence numbers, and a sender's
+clock only needs to be roughly right for its first datagram to be above the floor.
+
+Commands are applied latest-wins: if the device falls behind, only the latest command
+for each LED is sent.
+"""
+import hashlib
+import hmac
+import os
+import socket
+import struct
+import time
+from collections import OrderedDict
+from gevent.server import DatagramServer
+from . import common as cmn
+
+VERSION = 1
+HEADER = struct.Struct('>B8sQ')
+SENDER_SIZE = 8
+REPORT_SIZE = 8
+DIGEST_SIZE = 16
+PACKET_SIZE = HEADER.size + REPORT_SIZE + DIGEST_SIZE
+
+MODE_BASIC = 0x00
+MODE_STATIC = 0x01
+MODE_FADE = 0x02
+MODE_STROBE = 0x03
+MODE_WAVE = 0x04
+MODE_PATTERN = 0x06
+
+PORT = 5001
+# Number of senders whose last sequence number is kept
+SENDERS = 256
+
+
+def sign(key, message):
+    """Get the truncated HMAC of a message."""
+
+    return hmac.new(key, message, hashlib.sha256).digest()[:DIGEST_SIZE]
+
+
+def pack(key, sender, sequence, report):
+    """Pack a report into a signed datagram."""
+
+    message = HEADER.pack(VERSION, sender, sequence) + bytes(report).ljust(REPORT_SIZE, b'\x00')
+    return message + sign(key, message)
+
+
+def unpack(key, packet):
+    """
+    Verify a datagram and return its sender ID, sequence number, and report.
+
+    Raises `ValueError` if the datagram is malformed or not signed with the key.
+    """
+
+    if len(packet) != PACKET_SIZE:
+        raise ValueError('Invalid packet size')
+    message = packet[:-DIGEST_SIZE]
+    if not hmac.compare_digest(sign(key, message), packet[-DIGEST_SIZE:]):
+        raise ValueError('Invalid signature')
+    version, sender, sequence = HEADER.unpack_from(message)
+    if version != VERSION:
+        raise ValueError('Unsupported version {}'.format(version))
+    return sender, sequence, message[HEADER.size:]
+
+
+def decode(device, report):
+    """
+    Decode a report into the LED it targets and the device method call that sends it.
+
+    Returns `(led, func, args, kwargs)`. Raises `ValueError` if the report is not valid.
+    """
+
+    mode = report[0]
+    color = '#{:02x}{:02x}{:02x}'.format(*report[2:5])
+    if mode == MODE_BASIC:
+        cmn.validate_simple_color(report[1])
+        return cmn.LED_ALL, device.color, (chr(report[1]),), {}
+    elif mode in (MODE_STATIC, MODE_FADE, MODE_STROBE):
+        cmn.validate_led(report[1])
+        if mode == MODE_STATIC:
+            return report[1], device.color, (color,), {'led': report[1]}
+        elif mode == MODE_FADE:
+            return report[1], device.fade, (color,), {'led': report[1], 'speed': report[5]}
+        return report[1], device.strobe, (color,), {'led': report[1], 'speed': report[5], 'repeat': report[7]}
+    elif mode == MODE_WAVE:
+        cmn.validate_wave(report[1])
+        return cmn.LED_ALL, device.wave, (color,), {'wave': report[1], 'speed': report[7], 'repeat': report[6]}
+    elif mode == MODE_PATTERN:
+        cmn.validate_pattern(report[1])
+        return cmn.LED_ALL, device.pattern, (report[1],), {'repeat': report[2]}
+    raise ValueError('Unknown command mode {}'.format(mode))
+
+
+class UdpListener:
+    """Accept signed binary commands over UDP and hand them to a `Coalescer`."""
+
+    def __init__(self, listener, coalescer, token, logger, on_drop=None, senders=SENDERS):
+        """Initialize."""
+
+        self.coalescer = coalescer
+        self.key = token.encode('utf-8')
+        self.logger = logger
+        # Optional callback that is called with the reason (`unauthenticated`, `stale`, or `invalid`)
+        # a datagram was dropped.
+        self.on_drop = on_drop
+        # Last sequence number accepted for each sender ID, least recently used first.
+        self.sequences = OrderedDict()
+        self.senders = senders
+        # Highest sequence number of the senders that have been forgotten.
+        self.floor = 0
+        self.server = DatagramServer(listener, self.handle)
+
+    def start(self):
+        """Start the server."""
+
+        self.server.start()
+
+    def stop(self, timeout=None):
+        """Stop the server."""
+
+        self.server.stop(timeout)
+
+    def drop(self, reason, message):
+        """Note a dropped datagram."""
+
+        self.logger.debug('Dropped UDP command: {}'.format(message))
+        if self.on_drop is not None:
+            self.on_drop(reason)
+
+    def handle(self, packet, address):
+        """Handle a datagram."""
+
+        try:
+            sender, sequence, report = unpack(self.key, packet)
+        except ValueError as e:
+            self.drop('unauthenticated', e)
+            return
+
+        last = self.sequences.get(sender, self.floor)
+        if sequence <= last:
+            self.drop('stale', 'Sequence {} is not newer than {}'.format(sequence, last))
+            return
+
+        try:
+            led, func, args, kwargs = decode(self.coalescer.device, report)
+        except ValueError as e:
+            self.drop('invalid', e)
+            return
+
+        self.sequences[sender] = sequence
+        self.sequences.move_to_end(sender)
+        if len(self.sequences) > self.senders:
+            self.floor = max(self.floor, self.sequences.popitem(last=False)[1])
+        self.coalescer.put(led, func, args, kwargs)
+
+
+class LuxUdp:
+    """Send signed binary commands to a server's UDP listener."""
+
+    def __init__(self, host='127.0.0.1', port=PORT, token=''):
+        """Initialize."""
+
+        self.address = (host, port)
+        self.key = token.encode('utf-8')
+        self.sender = os.urandom(SENDER_SIZE)
+        self.sequence = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def close(self):
+        """Close the socket."""
+
+        self.sock.close()
+
+    def send(self, report):
+        """Send a report (the USB report without the report number)."""
+
+        # Microseconds keep the first sequence number of a new sender above the floor of forgotten senders.
+        self.sequence = max(self.sequence + 1, time.time_ns() // 1000)
+        self.sock.sendto(pack(self.key, self.sender, self.sequence, report), self.address)
+
+    def color(self, color, *, led=cmn.LED_ALL):
+        """Set color."""
+
+        if len(color) == 1:
+            cmn.validate_simple_color(ord(color.upper()))
+            self.send([MODE_BASIC, ord(color.upper())])
+        else:
+            cmn.validate_led(led)
+            self.send([MODE_STATIC, led, *cmn.resolve_color(color)])
+
+    def fade(self, color, *, led=cmn.LED_ALL, speed=0):
+        """Fade to color."""
+
+        cmn.validate_led(led)
+        cmn.validate_speed(speed)
+        self.send([MODE_FADE, led, *cmn.resolve_color(color), speed])
+
+    def strobe(self, color, *, led=cmn.LED_ALL, speed=0, repeat=0):
+        """Strobe color."""
+
+        cmn.validate_led(led)
+        cmn.validate_speed(speed)
+        cmn.validate_repeat(repeat)
+        self.send([MODE_STROBE, led, *cmn.resolve_color(color), speed, 0, repeat])
+
+    def wave(self, color, *, wave=cmn.WAVE_SHORT, speed=0, repeat=0):
+        """Wave effect."""
+
+        cmn.validate_wave(wave)
+        cmn.validate_speed(speed)
+        cmn.validate_repeat(repeat)
+        self.send([MODE_WAVE, wave, *cmn.resolve_color(color), 0, repeat, speed])
+
+    def pattern(self, pattern, *, repeat=0):
+        """Display pattern."""
+
+        cmn.validate_pattern(pattern)
+        cmn.validate_repeat(repeat)
+        self.send([MODE_PATTERN, pattern, repeat])
+
+    def off(self):
+        """Turn off."""
+
+        self.send([MODE_BASIC, cmn.COLOR_OFF])
@@ -5,8 +5,13 @@ apmorton/pyhidapi: https://github.com/apmorton/pyhidapi
 libusb/hidapi: https://github.com/libusb/hidapi
 
 """
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextlib
 import hid
 import os
+import struct
+import threading
+import time
 from .common import (
     LED_ALL, LED_BACK, LED_FRONT, LED_1, LED_2, LED_3, LED_4, LED_5, LED_6,
     WAVE_SHORT, WAVE_LONG, WAVE_OVERLAPPING_SHORT, WAVE_OVERLAPPING_LONG,
@@ -16,12 +21,14 @@ from .common import (
     PATTERN_1, PATTERN_2, PATTERN_3, PATTERN_4, PATTERN_5, PATTERN_6, PATTERN_7, PATTERN_8
 )
 from .import common as cmn
-from .csscolors import name2hex
+from .common import resolve_color
+from . import metrics
+from . import tracing
 
 __version__ = '0.1'
 
 __all__ = (
-    'Luxafor', 'enumerate_luxafor',
+    'Luxafor', 'LuxaforGroup', 'enumerate_luxafor',
     'LED_ALL', 'LED_BACK', 'LED_FRONT', 'LED_1', 'LED_2', 'LED_3', 'LED_4', 'LED_5', 'LED_6',
     'WAVE_SHORT', 'WAVE_LONG', 'WAVE_OVERLAPPING_SHORT', 'WAVE_OVERLAPPING_LONG',
     'WAVE_1', 'WAVE_2', 'WAVE_3', 'WAVE_4', 'WAVE_5',
@@ -45,9 +52,43 @@ MODE_PATTERN = 0x6
 MSG_NON_IMMEDIATE_COMPLETE = b'\x00\x01\x00\x00\x00\x00\x00\x00'
 MSG_NONE = b''
 MSG_SIZE = 8
+# Milliseconds to wait on each read, so the reader notices when nothing is left to wait on.
+READ_TIMEOUT = 100
 
 CMD_REPORT_NUM = 0
 
+# Seconds a group waits for all of its devices to be ready to start a command together.
+BARRIER_TIMEOUT = 1.0
+
+# Reports are packed in one call from precompiled layouts: the basic color command and every other command.
+BASIC_REPORT = struct.Struct('3B')
+REPORT = struct.Struct('9B')
+
+# Indexes into the shadow state of the LEDs each LED value addresses (the front is the tab side, LEDs 1-3).
+LED_INDEXES = {
+    LED_ALL: (0, 1, 2, 3, 4, 5),
+    LED_FRONT: (0, 1, 2),
+    LED_BACK: (3, 4, 5),
+    LED_1: (0,),
+    LED_2: (1,),
+    LED_3: (2,),
+    LED_4: (3,),
+    LED_5: (4,),
+    LED_6: (5,)
+}
+
+# RGB values of the built-in colors
+BASIC_RGB = {
+    cmn.COLOR_RED: (255, 0, 0),
+    cmn.COLOR_GREEN: (0, 255, 0),
+    cmn.COLOR_BLUE: (0, 0, 255),
+    cmn.COLOR_CYAN: (0, 255, 255),
+    cmn.COLOR_YELLOW: (255, 255, 0),
+    cmn.COLOR_MAGENTA: (255, 0, 255),
+    cmn.COLOR_WHITE: (255, 255, 255),
+    cmn.COLOR_OFF: (0, 0, 0)
+}
+
 
 def clamp(value, mn=0, mx=255):
     """Clamp the value to the the given minimum and maximum."""
@@ -55,39 +96,33 @@ def clamp(value, mn=0, mx=255):
     return max(min(value, mx), mn)
 
 
-def resolve_color(color):
-    """Resolve color."""
+def enumerate_luxafor():
+    """Enumerate all Luxafor devices."""
 
-    orig = color = color.lower()
-    if color == 'off':
-        color = 'black'
-    if not color.startswith('#'):
-        color = name2hex(color)
-        if color is None:
-            raise ValueError('{} is not a valid color name'.format(orig))
+    return hid.enumerate(vid=LUXAFOR_VENDOR, pid=LUXAFOR_PRODUCT)
 
-    if len(color) == 7:
-        color = (
-            int(color[1:3], 16),
-            int(color[3:5], 16),
-            int(color[5:7], 16)
-        )
-    elif len(color) == 4:
-        color = (
-            int(color[1:2] * 2, 16),
-            int(color[2:3] * 2, 16),
-            int(color[3:4] * 2, 16)
-        )
-    else:
-        raise ValueError('{} is not a valid color code'.format(orig))
 
-    return color
+class Completion(Future):
+    """
+    Completion of a command that takes time to finish, such as a fade.
 
+    The result is false once the device reports the command is done, or once another command replaces it,
+    and true if the device was lost before then. Like the results of other commands, the completion itself
+    evaluates as true if the command could not be sent.
+    """
 
-def enumerate_luxafor():
-    """Enumerate all Luxafor devices."""
+    def __init__(self):
+        """Initialize."""
 
-    return hid.enumerate(vid=LUXAFOR_VENDOR, pid=LUXAFOR_PRODUCT)
+        super().__init__()
+        self.failed = False
+        # Whether the device reports when the command is done (commands that repeat forever never are).
+        self.reported = True
+
+    def __bool__(self):
+        """Evaluate as true if the command could not be sent."""
+
+        return self.failed
 
 
 class Luxafor:
@@ -106,11 +141,26 @@ class Luxafor:
 
     """
 
-    def __init__(self, index=0, path=None):
+    def __init__(self, index=0, path=None, executor=None):
         """Initialize."""
 
+        # Last color written to each LED (1-6), or `None` if it is not known (such as while an effect runs).
+        self._state = [None] * 6
+        # Whether the shadow state can be trusted to skip writes, which it is not until the device accepts a write,
+        # nor after an error or a reconnect.
+        self._trusted = False
+        # Completion of the running command, resolved by a reader that runs while it is pending.
+        self._pending = None
+        self._pending_lock = threading.Lock()
+        self._reader = None
+        # Number of callers that need the reader stopped, such as while the device is asked for its serial, replaced,
+        # or closed, so the reader never takes a reply meant for someone else or reads from a device that is going away.
+        self._paused = 0
+        # Optional callable, `executor(func, args, kwargs)`, that runs blocking device I/O somewhere that does not
+        # block the caller's event loop (such as `gevent.threadpool.ThreadPool.apply`) and returns the result.
+        self._executor = executor
         device = None
-        devices = enumerate_luxafor()
+        devices = self._io(enumerate_luxafor)
         if not devices:
             raise RuntimeError('Cannot find a valid connected Luxafor device')
         if path is not None:
@@ -126,17 +176,95 @@ class Luxafor:
                 raise RuntimeError('The Luxafor device at index {} cannot be found'.format(index))
             device = devices[index]['path']
         self._path = device
-        self._device = hid.Device(path=self._path)
+        self._device = self._io(hid.Device, path=self._path)
         self._closed = False
         self._disconnected = False
         self._serial = self._get_serial()
+        # Optional callback that is called with `False` when the device is lost and `True` when it is found again.
+        self.on_connection = None
 
-    def _get_serial(self):
-        """Get serial number."""
+    def _io(self, func, *args, **kwargs):
+        """Run blocking device I/O, on the executor if there is one."""
+
+        if self._executor is None:
+            return func(*args, **kwargs)
+        return self._executor(func, args, kwargs)
+
+    def _read_serial(self):
+        """Read the serial number from the device."""
 
         self._device.write(b'\x00\x80')
         return self._device.read(MSG_SIZE, 3)
 
+    def _get_serial(self):
+        """Get serial number."""
+
+        return self._io(self._read_serial)
+
+    @property
+    def serial(self):
+        """Serial number of the device as a hex string."""
+
+        return self._serial.hex()
+
+    def connected(self):
+        """Check if the device is currently connected."""
+
+        return not self._disconnected and not self._closed
+
+    def state(self):
+        """Get the last color written to each LED (1-6) as an RGB tuple, or `None` if it is not known."""
+
+        return tuple(self._state)
+
+    def _unchanged(self, led, rgb):
+        """Check if setting the LEDs to a color would not change anything that is visible."""
+
+        if not self._trusted or not self.connected():
+            # Let the write go through so it can reconnect, or confirm the shadow state.
+            return False
+        state = self._state
+        for i in LED_INDEXES[led]:
+            if state[i] != rgb:
+                return False
+        return self._present()
+
+    def _present(self):
+        """
+        Check that the device has not been unplugged, so a write to it can be skipped.
+
+        A read that does not wait fails once the device is gone. It returns at once, so it is called directly instead
+        of through the executor. Anything it reads is stale, as nothing waits on a report when the reader is not
+        running, and while the reader runs, its own reads notice a lost device instead.
+        """
+
+        if self._reader is not None:
+            return True
+        try:
+            self._device.read(MSG_SIZE, 0)
+        except hid.HIDException:
+            # Let the write through, so it reconnects and restores the colors.
+            self._trusted = False
+            return False
+        return True
+
+    def _update(self, led, rgb):
+        """Update the shadow state of the LEDs."""
+
+        for i in LED_INDEXES[led]:
+            self._state[i] = rgb
+
+    def _restore(self):
+        """Write the last known colors back to the device."""
+
+        state = self._state
+        if state[0] is not None and state.count(state[0]) == len(state):
+            colors = [(LED_ALL, state[0])]
+        else:
+            colors = [(i + 1, rgb) for i, rgb in enumerate(state) if rgb is not None]
+        for led, rgb in colors:
+            self._io(self._device.write, REPORT.pack(CMD_REPORT_NUM, MODE_STATIC, led, *rgb, 0, 0, 0))
+
     def __enter__(self):
         """Enter."""
 
@@ -150,42 +278,66 @@ class Luxafor:
     def _disconnect(self):
         """Disconnect the device."""
 
-        if self._device is not None:
-            self._device.close()
-            self._disconnected = True
-            self._device = None
+        self._trusted = False
+        with self._reader_paused():
+            if self._device is not None:
+                self._io(self._device.close)
+                self._disconnected = True
+                self._device = None
+
+    def _notify_connection(self, connected):
+        """Notify the connection callback of a change in the connection."""
+
+        if self.on_connection is not None:
+            self.on_connection(connected)
 
     def _reconnect(self):
         """Reconnect device."""
 
-        devices = enumerate_luxafor()
-        for device in devices:
-            path = device['path']
-            try:
-                self._device = hid.Device(path=path)
-                if self._get_serial() == self._serial:
-                    self._path = path
-                    self._disconnected = False
-                    break
-                else:
+        # The reader is paused until the device has been found and answered with its serial.
+        with self._reader_paused():
+            devices = self._io(enumerate_luxafor)
+            for device in devices:
+                path = device['path']
+                try:
+                    self._device = self._io(hid.Device, path=path)
+                    if self._get_serial() == self._serial:
+                        self._path = path
+                        self._disconnected = False
+                        break
+                    else:
+                        self._disconnect()
+                except Exception:
                     self._disconnect()
-            except Exception:
+
+        # Restore the colors that were showing before the device was lost. The colors are still not trusted, so the
+        # next write goes to the device whatever it is.
+        if not self._disconnected:
+            try:
+                self._restore()
+            except hid.HIDException:
                 self._disconnect()
+        self._trusted = False
 
+        metrics.RECONNECTS.inc('failure' if self._disconnected else 'success')
         return not self._disconnected
 
     def close(self):
         """Close Luxafor device."""
 
         self._closed = True
-        return self._device.close()
+        completion = self._pending
+        if completion is not None:
+            self._resolve(completion, True)
+        with self._reader_paused():
+            return self._io(self._device.close)
 
-    def off(self):
+    def off(self, *, force=False):
         """Set all LEDs to off."""
 
-        return self.basic_color('O')
+        return self.basic_color('O', force=force)
 
-    def basic_color(self, color):
+    def basic_color(self, color, *, force=False):
         """
         Build basic color command.
 
@@ -205,9 +357,15 @@ class Luxafor:
 
         color = ord(color.upper())
         cmn.validate_simple_color(color)
-        return self._execute([CMD_REPORT_NUM, MODE_BASIC, color])
-
-    def color(self, color, *, led=LED_ALL):
+        rgb = BASIC_RGB[color]
+        if not force and self._unchanged(LED_ALL, rgb):
+            return False
+        error = self._execute(BASIC_REPORT.pack(CMD_REPORT_NUM, MODE_BASIC, color))
+        if not error:
+            self._update(LED_ALL, rgb)
+        return error
+
+    def color(self, color, *, led=LED_ALL, force=False):
         """
         Build static color command.
 
@@ -226,11 +384,17 @@ class Luxafor:
         """
 
         if isinstance(color, str) and len(color) == 1:
-            return self.basic_color(color)
+            return self.basic_color(color, force=force)
         else:
-            red, green, blue = resolve_color(color)
+            with tracing.span('resolve'):
+                rgb = resolve_color(color)
             cmn.validate_led(led)
-            return self._execute([CMD_REPORT_NUM, MODE_STATIC, led, red, green, blue, 0, 0, 0])
+            if not force and self._unchanged(led, rgb):
+                return False
+            error = self._execute(REPORT.pack(CMD_REPORT_NUM, MODE_STATIC, led, *rgb, 0, 0, 0))
+            if not error:
+                self._update(led, rgb)
+            return error
 
     def fade(self, color, *, led=LED_ALL, speed=1, wait=False):
         """
@@ -253,7 +417,8 @@ class Luxafor:
         red, green, blue = resolve_color(color)
         cmn.validate_led(led)
         cmn.validate_speed(speed)
-        return self._execute([CMD_REPORT_NUM, MODE_FADE, led, red, green, blue, speed, 0, 0], wait=wait)
+        self._update(led, None)
+        return self._start(REPORT.pack(CMD_REPORT_NUM, MODE_FADE, led, red, green, blue, speed, 0, 0), wait=wait)
 
     def wave(self, color, *, wave=WAVE_SHORT, speed=0, repeat=0, wait=False):
         """
@@ -280,7 +445,11 @@ class Luxafor:
         cmn.validate_wave(wave)
         cmn.validate_speed(speed)
         cmn.validate_repeat(repeat)
-        return self._execute([CMD_REPORT_NUM, MODE_WAVE, wave, red, green, blue, 0, repeat, speed], wait=wait)
+        self._update(LED_ALL, None)
+        return self._start(
+            REPORT.pack(CMD_REPORT_NUM, MODE_WAVE, wave, red, green, blue, 0, repeat, speed),
+            wait=wait, report=repeat != 0
+        )
 
     def strobe(self, color, *, led=LED_ALL, speed=0, repeat=0, wait=False):
         """
@@ -307,7 +476,11 @@ class Luxafor:
         cmn.validate_led(led)
         cmn.validate_speed(speed)
         cmn.validate_repeat(repeat)
-        return self._execute([CMD_REPORT_NUM, MODE_STROBE, led, red, green, blue, speed, 0, repeat], wait=wait)
+        self._update(led, None)
+        return self._start(
+            REPORT.pack(CMD_REPORT_NUM, MODE_STROBE, led, red, green, blue, speed, 0, repeat),
+            wait=wait, report=repeat != 0
+        )
 
     def pattern(self, pattern, *, repeat=0, wait=False):
         """
@@ -327,41 +500,316 @@ class Luxafor:
             wait = False
         cmn.validate_pattern(pattern)
         cmn.validate_repeat(repeat)
-        return self._execute([CMD_REPORT_NUM, MODE_PATTERN, pattern, repeat, 0, 0, 0, 0, 0], wait=wait)
+        self._update(LED_ALL, None)
+        return self._start(
+            REPORT.pack(CMD_REPORT_NUM, MODE_PATTERN, pattern, repeat, 0, 0, 0, 0, 0), wait=wait, report=repeat != 0
+        )
 
-    def _execute(self, cmd, wait=False):
+    def send_frame(self, frame):
         """
-        Set color.
+        Send a report that is already encoded, skipping argument validation and color resolution.
+
+        The report is laid out as described for each command, starting with the report number. Static and basic
+        colors update the shadow state, and any other command marks the LEDs as unknown. Nothing waits on commands
+        that take time to complete.
 
         Return false if there was an error.
         """
 
-        if self._disconnected and not self._reconnect():
-            return True
+        if type(frame) is not bytes:
+            frame = bytes(frame)
+        size = len(frame)
+        if size < 3 or size > REPORT.size or frame[0] != CMD_REPORT_NUM:
+            raise ValueError('Frames must be 3-{} bytes starting with report number 0'.format(REPORT.size))
+
+        error = self._execute(frame)
+        if not error:
+            mode = frame[1]
+            if mode == MODE_STATIC and size >= 6 and frame[2] in LED_INDEXES:
+                self._update(frame[2], tuple(frame[3:6]))
+            elif mode == MODE_BASIC:
+                self._update(LED_ALL, BASIC_RGB.get(frame[2]))
+            else:
+                self._update(LED_ALL, None)
+        return error
+
+    def _track(self, completion):
+        """
+        Make `completion` the pending completion, resolving the one it replaces.
+
+        A new command replaces whatever effect is running, so the replaced completion is resolved as done.
+        """
+
+        if completion is None and self._pending is None:
+            # Nothing to replace (only this method sets a completion, so no lock is needed to see that).
+            return
+        with self._pending_lock:
+            replaced, self._pending = self._pending, completion
+            self._start_reader()
+        if replaced is not None:
+            replaced.set_result(False)
+
+    def _resolve(self, completion, failed):
+        """Resolve `completion` if it is still pending."""
+
+        with self._pending_lock:
+            if self._pending is not completion:
+                return
+            self._pending = None
+        completion.set_result(failed)
+
+    def _start_reader(self):
+        """Start the reader if a reported completion is pending and it is neither running nor paused."""
+
+        # Called with `_pending_lock` held.
+        completion = self._pending
+        if completion is not None and completion.reported and self._reader is None and not self._paused:
+            self._reader = threading.Thread(target=self._read_reports, daemon=True)
+            self._reader.start()
+
+    @contextlib.contextmanager
+    def _reader_paused(self):
+        """Stop the reader, waiting for a read that is under way, and keep it stopped until the block is done."""
+
+        with self._pending_lock:
+            self._paused += 1
+            reader = self._reader
+        try:
+            # A completion callback runs on the reader, and may send a command that ends up here.
+            if reader is not None and reader is not threading.current_thread():
+                # Wait on the executor, as a read can take up to `READ_TIMEOUT` and must not block the event loop.
+                self._io(reader.join)
+            yield
+        finally:
+            with self._pending_lock:
+                self._paused -= 1
+                self._start_reader()
+
+    def _read_reports(self):
+        """
+        Read input reports from the device and resolve the pending completion, until nothing is pending.
+
+        This runs on its own thread. The server does not monkey patch `threading`, so it is an OS thread there too,
+        and as it is not the event loop's thread, its reads run on it directly even with an executor (that is what
+        `gevent.threadpool.ThreadPool.apply` does when called from another thread). Writes are not held up by it.
+        Rather than sharing a lock with the event loop, it is stopped while the device is reconnected or closed.
+        """
+
+        while True:
+            with self._pending_lock:
+                completion = self._pending
+                if completion is None or not completion.reported or self._paused:
+                    self._reader = None
+                    return
+            device = self._device
+            if device is None:
+                # Disconnected: the command being sent reconnects, or fails and resolves the completion itself.
+                report = MSG_NONE
+            else:
+                try:
+                    report = self._io(device.read, MSG_SIZE, READ_TIMEOUT)
+                except Exception:
+                    # The device was lost (or closed), the next command will attempt to reconnect.
+                    self._trusted = False
+                    report = None
+            if report is None:
+                self._resolve(completion, True)
+            elif report == MSG_NON_IMMEDIATE_COMPLETE:
+                self._resolve(completion, False)
+            elif device is None:
+                time.sleep(READ_TIMEOUT / 1000)
+
+    def _start(self, cmd, wait=False, report=True):
+        """
+        Execute a command that takes time to complete and return its `Completion`.
+
+        If `report` is disabled, the device will not report when the command completes (it repeats forever),
+        so the completion is only resolved when another command replaces it.
+        """
+
+        completion = Completion()
+        completion.reported = report
+        self._track(completion)
+        if self._write(cmd):
+            completion.failed = True
+            self._resolve(completion, True)
+        elif wait:
+            # When the `hid` is released on Windows, the current
+            # command may not complete. Using wait before the
+            # script exits will help ensure the command completes.
+            with tracing.span('read'):
+                start = time.perf_counter()
+                completion.result()
+                metrics.HID_READ.time(start)
+        return completion
+
+    def _execute(self, cmd):
+        """
+        Execute a command that completes immediately.
+
+        Return false if there was an error.
+        """
+
+        self._track(None)
+        return self._write(cmd)
+
+    def _write(self, cmd):
+        """
+        Write a command to the device, reconnecting if needed.
+
+        Return false if there was an error.
+        """
+
+        if self._disconnected:
+            if not self._reconnect():
+                return True
+            self._notify_connection(True)
         elif self._closed:
             return True
 
         try:
-            self._device.write(bytes(cmd))
+            with tracing.span('write'):
+                start = time.perf_counter()
+                self._io(self._device.write, cmd)
+                metrics.HID_WRITE.time(start)
+            self._trusted = True
         except hid.HIDException:
             # Failed to connect
             self._disconnect()
+            self._notify_connection(False)
 
         # Attempt to reconnect and try again
         if self._disconnected:
             if not self._reconnect():
                 return True
-            self._device.write(bytes(cmd))
+            self._notify_connection(True)
+            with tracing.span('write'):
+                start = time.perf_counter()
+                self._io(self._device.write, cmd)
+                metrics.HID_WRITE.time(start)
+            self._trusted = True
+        return False
 
-        # Wait for commands that take time to complete.
-        # When the `hid` is released on Windows, the current
-        # command may not complete. Using wait before the
-        # script exits will help ensure the command completes.
-        if wait:
-            try:
-                while self._device.read(MSG_SIZE, 100) != MSG_NON_IMMEDIATE_COMPLETE:
+
+class LuxaforGroup:
+    """
+    Control several Luxafor devices as one.
+
+    Each device gets its own worker thread, so a command is sent to every device in parallel instead of one after
+    the other. Commands return a list with the result from each device, in the order of `devices`.
+
+    With `barrier` enabled, the workers wait for each other before writing, so effects start on every device at
+    nearly the same moment.
+    """
+
+    def __init__(self, serials=None, executor=None):
+        """Initialize."""
+
+        devices = []
+        try:
+            for d in enumerate_luxafor():
+                device = Luxafor(path=d['path'], executor=executor)
+                if serials is None or device.serial in serials:
+                    devices.append(device)
+                else:
+                    device.close()
+        except Exception:
+            for device in devices:
+                device.close()
+            raise
+
+        if serials is not None:
+            missing = set(serials) - set(device.serial for device in devices)
+            if missing:
+                for device in devices:
+                    device.close()
+                raise RuntimeError(
+                    'The Luxafor devices with serials {} could not be found'.format(', '.join(sorted(missing)))
+                )
+        if not devices:
+            raise RuntimeError('Cannot find a valid connected Luxafor device')
+
+        self.devices = devices
+        self._workers = [ThreadPoolExecutor(max_workers=1) for _ in devices]
+
+    @property
+    def serials(self):
+        """Serial numbers of the devices."""
+
+        return [device.serial for device in self.devices]
+
+    def __enter__(self):
+        """Enter."""
+
+        return self
+
+    def __exit__(self, type, value, traceback):  # noqa: A002
+        """Exit."""
+
+        return self.close()
+
+    def close(self):
+        """Stop the workers and close the devices."""
+
+        for worker in self._workers:
+            worker.shutdown()
+        for device in self.devices:
+            device.close()
+
+    def _broadcast(self, name, args, kwargs, barrier):
+        """Run a command on every device in parallel and return the results."""
+
+        sync = threading.Barrier(len(self.devices), timeout=BARRIER_TIMEOUT) if barrier else None
+
+        def call(device):
+            """Run the command on a device."""
+
+            if sync is not None:
+                try:
+                    sync.wait()
+                except threading.BrokenBarrierError:
+                    # A device is still busy with an earlier command, go ahead without it.
                     pass
-            except hid.HIDException:
-                self._disconnect()
-                return True
-        return False
+            return getattr(device, name)(*args, **kwargs)
+
+        futures = [worker.submit(call, device) for worker, device in zip(self._workers, self.devices)]
+        return [future.result() for future in futures]
+
+    def off(self, *, force=False, barrier=False):
+        """Set all LEDs to off."""
+
+        return self._broadcast('off', (), {'force': force}, barrier)
+
+    def color(self, color, *, led=LED_ALL, force=False, barrier=False):
+        """Set color."""
+
+        return self._broadcast('color', (color,), {'led': led, 'force': force}, barrier)
+
+    def fade(self, color, *, led=LED_ALL, speed=1, wait=False, barrier=False):
+        """Fade to color."""
+
+        return self._broadcast('fade', (color,), {'led': led, 'speed': speed, 'wait': wait}, barrier)
+
+    def wave(self, color, *, wave=WAVE_SHORT, speed=0, repeat=0, wait=False, barrier=False):
+        """Wave effect."""
+
+        return self._broadcast(
+            'wave', (color,), {'wave': wave, 'speed': speed, 'repeat': repeat, 'wait': wait}, barrier
+        )
+
+    def strobe(self, color, *, led=LED_ALL, speed=0, repeat=0, wait=False, barrier=False):
+        """Strobe color."""
+
+        return self._broadcast(
+            'strobe', (color,), {'led': led, 'speed': speed, 'repeat': repeat, 'wait': wait}, barrier
+        )
+
+    def pattern(self, pattern, *, repeat=0, wait=False, barrier=False):
+        """Display pattern."""
+
+        return self._broadcast('pattern', (pattern,), {'repeat': repeat, 'wait': wait}, barrier)
+
+    def send_frame(self, frame, *, barrier=False):
+        """Send a report that is already encoded."""
+
+        return self._broadcast('send_frame', (frame,), {}, barrier)
@@ -62,6 +62,7 @@ setup(
     packages=find_packages(exclude=['tests', 'tools']),
     entry_points=entry_points,
     install_requires=get_requirements(),
+    python_requires='>=3.7',
     license='MIT License',
     classifiers=[
         'Development Status :: %s' % DEVSTATUS,
@@ -70,8 +71,6 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ]
@@ -0,0 +1,251 @@
+"""Test cron expressions."""
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+from pyluxa4 import simulator
+from pyluxa4.cron import Cron, parse_field, MONTH_NAMES, DAY_NAMES
+from . import util
+
+
+def bits(*values):
+    """Get a bit mask with the given bits set."""
+
+    mask = 0
+    for value in values:
+        mask |= 1 << value
+    return mask
+
+
+def matches(cron, dt):
+    """Check if a `datetime` matches by testing each field directly."""
+
+    weekday = (dt.weekday() + 1) % 7
+    day = bool(cron.days & (1 << dt.day))
+    dow = bool(cron.weekdays & (1 << weekday))
+    if cron.any_day:
+        day_match = dow
+    elif cron.any_weekday:
+        day_match = day
+    else:
+        day_match = day or dow
+    return (
+        bool(cron.minutes & (1 << dt.minute)) and
+        bool(cron.hours & (1 << dt.hour)) and
+        bool(cron.months & (1 << dt.month)) and
+        day_match
+    )
+
+
+class TestParse(unittest.TestCase):
+    """Test parsing of fields and expressions."""
+
+    def test_any(self):
+        """Test `*`."""
+
+        self.assertEqual(parse_field('*', 0, 5), bits(0, 1, 2, 3, 4, 5))
+
+    def test_values(self):
+        """Test single values, ranges, and lists."""
+
+        self.assertEqual(parse_field('3', 0, 59), bits(3))
+        self.assertEqual(parse_field('1-3', 0, 59), bits(1, 2, 3))
+        self.assertEqual(parse_field('1,5,10-11', 0, 59), bits(1, 5, 10, 11))
+
+    def test_steps(self):
+        """Test steps of `*`, ranges, and single values."""
+
+        self.assertEqual(parse_field('*/15', 0, 59), bits(0, 15, 30, 45))
+        self.assertEqual(parse_field('1-10/4', 0, 59), bits(1, 5, 9))
+        self.assertEqual(parse_field('50/4', 0, 59), bits(50, 54, 58))
+
+    def test_names(self):
+        """Test month and day names."""
+
+        self.assertEqual(parse_field('jan,MAR-apr', 1, 12, MONTH_NAMES), bits(1, 3, 4))
+        self.assertEqual(parse_field('mon-fri', 0, 7, DAY_NAMES), bits(1, 2, 3, 4, 5))
+
+    def test_sunday(self):
+        """Test both 0 and 7 are Sunday."""
+
+        self.assertEqual(Cron('0 0 * * 7').weekdays, bits(0))
+        self.assertEqual(Cron('0 0 * * 5-7').weekdays, bits(0, 5, 6))
+
+    def test_macros(self):
+        """Test macros."""
+
+        cron = Cron('@weekly')
+        self.assertEqual(cron.minutes, bits(0))
+        self.assertEqual(cron.hours, bits(0))
+        self.assertEqual(cron.weekdays, bits(0))
+
+    def test_invalid(self):
+        """Test invalid expressions."""
+
+        for expression in (
+            '* * * *', '* * * * * *', '60 * * * *', '* 24 * * *', '* * 0 * *', '* * * 13 *',
+            '* * * * 8', '5-1 * * * *', '*/0 * * * *', 'x * * * *', '* * * foo *'
+        ):
+            with self.assertRaises(ValueError, msg=expression):
+                Cron(expression)
+
+        with self.assertRaises(TypeError):
+            Cron(5)
+
+    def test_restricted(self):
+        """Test only a bare `*` leaves the day fields unrestricted."""
+
+        cron = Cron('0 0 */2 * *')
+        self.assertFalse(cron.any_day)
+        self.assertTrue(cron.any_weekday)
+        cron = Cron('0 0 * * 1-5/2')
+        self.assertTrue(cron.any_day)
+        self.assertFalse(cron.any_weekday)
+
+
+class TestNextTime(unittest.TestCase):
+    """Test finding the next matching time."""
+
+    def setUp(self):
+        """Set up."""
+
+        if sys.platform.startswith('win'):
+            self.skipTest('Requires time.tzset')
+        self.tz = util.timezone('UTC')
+        self.tz.__enter__()
+
+    def tearDown(self):
+        """Tear down."""
+
+        self.tz.__exit__(None, None, None)
+
+    def next_time(self, expression, after):
+        """Get the next local time as a string."""
+
+        return util.local(Cron(expression).next_time(util.timestamp(after)))
+
+    def fires(self, expression, start, end):
+        """Get the local times a cron record fires between `start` and `end`."""
+
+        commands = simulator.simulate([{"cmd": "off", "cron": expression}], util.timestamp(start), util.timestamp(end))
+        return [util.local(t) for t, cmd, args, kwargs in commands]
+
+    def test_next(self):
+        """Test the next time is strictly after the given time."""
+
+        self.assertEqual(self.next_time('*/15 * * * *', '2026-03-01 10:00'), '2026-03-01 10:15')
+        self.assertEqual(self.next_time('0 9 * * *', '2026-03-01 08:59'), '2026-03-01 09:00')
+        self.assertEqual(self.next_time('0 9 * * *', '2026-03-01 09:00'), '2026-03-02 09:00')
+
+    def test_rollover(self):
+        """Test rolling over to the next hour, day, month, and year."""
+
+        self.assertEqual(self.next_time('5 * * * *', '2026-03-01 23:10'), '2026-03-02 00:05')
+        self.assertEqual(self.next_time('0 0 * * *', '2026-02-28 12:00'), '2026-03-01 00:00')
+        self.assertEqual(self.next_time('0 0 31 * *', '2026-04-01 00:00'), '2026-05-31 00:00')
+        self.assertEqual(self.next_time('0 0 1 1 *', '2026-03-01 00:00'), '2027-01-01 00:00')
+        self.assertEqual(self.next_time('0 0 29 2 *', '2026-03-01 00:00'), '2028-02-29 00:00')
+
+    def test_day_or_weekday(self):
+        """Test either the day of the month or the day of the week can match when both are restricted."""
+
+        # The 13th or any Friday
+        self.assertEqual(
+            self.fires('0 0 13 * fri', '2026-03-01 00:00', '2026-03-31 23:59'),
+            ['2026-03-06 00:00', '2026-03-13 00:00', '2026-03-20 00:00', '2026-03-27 00:00']
+        )
+        self.assertEqual(
+            self.fires('0 0 13 * fri', '2026-04-01 00:00', '2026-04-30 23:59'),
+            ['2026-04-03 00:00', '2026-04-10 00:00', '2026-04-13 00:00', '2026-04-17 00:00', '2026-04-24 00:00']
+        )
+
+    def test_steps(self):
+        """Test stepped day fields restrict the day like cron does."""
+
+        start = '2026-02-28 12:00'
+        end = '2026-03-12 23:59'
+        for expression, days in (
+            ('0 0 */2 * *', (1, 3, 5, 7, 9, 11)),
+            ('0 0 * * 1-5/2', (2, 4, 6, 9, 11)),
+            ('0 0 1 * */2', (1, 3, 5, 7, 8, 10, 12)),
+            ('0 0 */10 * mon', (1, 2, 9, 11))
+        ):
+            self.assertEqual(
+                self.fires(expression, start, end),
+                ['2026-03-{:02d} 00:00'.format(day) for day in days],
+                expression
+            )
+
+    def test_never(self):
+        """Test expressions that can never match."""
+
+        for expression in ('0 0 30 2 *', '0 0 31 4,6,9,11 *'):
+            with self.assertRaises(ValueError, msg=expression):
+                Cron(expression).next_time(util.timestamp('2026-01-01 00:00'))
+
+    def test_random(self):
+        """Compare the next time of random expressions against checking minute by minute."""
+
+        rand = random.Random(5)
+
+        def field(mn, mx):
+            kind = rand.random()
+            if kind < 0.3:
+                return '*'
+            start = rand.randint(mn, mx)
+            if kind < 0.5:
+                return str(start)
+            end = rand.randint(start, mx)
+            if kind < 0.7:
+                return '{}-{}'.format(start, end)
+            if kind < 0.85:
+                return '*/{}'.format(rand.randint(1, mx - mn + 1))
+            return '{}-{}/{}'.format(start, end, rand.randint(1, 5))
+
+        for _ in range(200):
+            expression = ' '.join(
+                (field(0, 59), field(0, 23), field(1, 31), field(1, 12), field(0, 7))
+            )
+            cron = Cron(expression)
+            after = datetime(2026, 1, 1) + timedelta(minutes=rand.randrange(366 * 24 * 60))
+            try:
+                t = cron.next_time(after.timestamp())
+            except ValueError:
+                continue
+            found = datetime.fromtimestamp(t)
+            self.assertTrue(matches(cron, found), expression)
+            # Nothing in between matches. Only check a bounded span minute by minute.
+            dt = after + timedelta(minutes=1)
+            while dt < found and dt < after + timedelta(days=2):
+                self.assertFalse(matches(cron, dt), '{} {}'.format(expression, dt))
+                dt += timedelta(minutes=1)
+
+
+@unittest.skipIf(sys.platform.startswith('win'), 'Requires time.tzset')
+class TestDaylightSaving(unittest.TestCase):
+    """Test cron expressions on days when daylight saving time changes."""
+
+    def fires(self, expression, day):
+        """Get the local times a cron record fires in the early hours of a New York day."""
+
+        with util.timezone('America/New_York'):
+            commands = simulator.simulate(
+                [{"cmd": "off", "cron": expression}],
+                util.timestamp(day + ' 00:00'),
+                util.timestamp(day + ' 05:59')
+            )
+            return [util.local(t) for t, cmd, args, kwargs in commands]
+
+    def test_spring_forward(self):
+        """Test a time that is skipped runs once after the change and the skipped hour is left out."""
+
+        self.assertEqual(self.fires('30 2 * * *', '2026-03-08'), ['2026-03-08 03:30'])
+        self.assertEqual(
+            self.fires('0 * * * *', '2026-03-08'),
+            ['2026-03-08 00:00', '2026-03-08 01:00', '2026-03-08 03:00', '2026-03-08 04:00', '2026-03-08 05:00']
+        )
+
+    def test_fall_back(self):
+        """Test a time that is repeated only runs once."""
+
+        self.assertEqual(self.fires('30 1 * * *', '2026-11-01'), ['2026-11-01 01:30'])
@@ -0,0 +1,63 @@
+"""Test the scheduler."""
+import sys
+import unittest
+from pyluxa4 import simulator
+from . import util
+
+
+@unittest.skipIf(sys.platform.startswith('win'), 'Requires time.tzset')
+class TestDaylightSaving(unittest.TestCase):
+    """Test that timers fire at the right wall clock time on days when daylight saving time changes."""
+
+    RECORDS = [{"cmd": "color", "days": "all", "times": ["01:30", "08:00", "23:00"], "args": {"color": "red"}}]
+
+    def fires(self, day):
+        """Simulate a day in New York and get the local times of the commands that were sent."""
+
+        with util.timezone('America/New_York'):
+            commands = simulator.simulate(
+                self.RECORDS,
+                util.timestamp(day + ' 00:00'),
+                util.timestamp(day + ' 23:59')
+            )
+            return [util.local(t) for t, cmd, args, kwargs in commands]
+
+    def test_normal(self):
+        """Test a day without a change."""
+
+        self.assertEqual(
+            self.fires('2026-03-09'),
+            ['2026-03-09 01:30', '2026-03-09 08:00', '2026-03-09 23:00']
+        )
+
+    def test_spring_forward(self):
+        """Test the day daylight saving time begins (23 hours long)."""
+
+        self.assertEqual(
+            self.fires('2026-03-08'),
+            ['2026-03-08 01:30', '2026-03-08 08:00', '2026-03-08 23:00']
+        )
+
+    def test_fall_back(self):
+        """Test the day daylight saving time ends (25 hours long)."""
+
+        self.assertEqual(
+            self.fires('2026-11-01'),
+            ['2026-11-01 01:30', '2026-11-01 08:00', '2026-11-01 23:00']
+        )
+
+    def test_across_change(self):
+        """Test a span that crosses the change keeps the same wall clock times."""
+
+        with util.timezone('America/New_York'):
+            commands = simulator.simulate(
+                [{"cmd": "off", "days": "all", "times": ["12:00"]}],
+                util.timestamp('2026-03-06 00:00'),
+                util.timestamp('2026-03-10 23:59')
+            )
+            fires = [util.local(t) for t, cmd, args, kwargs in commands]
+
+        self.assertEqual(
+            fires,
+            ['2026-03-06 12:00', '2026-03-07 12:00', '2026-03-08 12:00', '2026-03-09 12:00', '2026-03-10 12:00']
+        )
@@ -0,0 +1,149 @@
+"""Test the timer wheel."""
+import math
+import random
+import unittest
+from pyluxa4.timerwheel import TimerWheel, SIZE
+
+
+class NaiveWheel:
+    """A dictionary of expiration ticks that is scanned on every advance."""
+
+    def __init__(self, now, resolution=1.0):
+        """Initialize."""
+
+        self.resolution = resolution
+        # The next tick to process
+        self.current = math.ceil(now / resolution)
+        self.keys = {}
+
+    def add(self, key, t):
+        """Add (or move) a key, keys that have already passed expire on the next tick."""
+
+        self.keys[key] = max(math.ceil(t / self.resolution), self.current)
+
+    def remove(self, key):
+        """Remove a key."""
+
+        return self.keys.pop(key, None) is not None
+
+    def advance(self, now):
+        """Get the keys that have expired."""
+
+        target = math.floor(now / self.resolution)
+        self.current = max(self.current, target + 1)
+        expired = [key for key, tick in self.keys.items() if tick <= target]
+        for key in expired:
+            del self.keys[key]
+        return expired
+
+
+class TestTimerWheel(unittest.TestCase):
+    """Test the timer wheel."""
+
+    def test_expire(self):
+        """Test keys expire once their time has been reached and not before."""
+
+        wheel = TimerWheel(0)
+        wheel.add('a', 10)
+        wheel.add('b', 10.5)
+        self.assertEqual(wheel.advance(9.9), [])
+        self.assertEqual(wheel.advance(10), ['a'])
+        self.assertEqual(wheel.advance(10.9), [])
+        self.assertEqual(wheel.advance(11), ['b'])
+        self.assertEqual(len(wheel), 0)
+        self.assertIsNone(wheel.next_due())
+
+    def test_past(self):
+        """Test a key added in the past expires on the next advance."""
+
+        wheel = TimerWheel(100)
+        wheel.add('a', 50)
+        self.assertEqual(wheel.advance(100), ['a'])
+
+    def test_remove(self):
+        """Test removed keys never expire."""
+
+        wheel = TimerWheel(0)
+        wheel.add('a', 5)
+        wheel.add('b', 5)
+        self.assertTrue(wheel.remove('a'))
+        self.assertFalse(wheel.remove('a'))
+        self.assertNotIn('a', wheel)
+        self.assertEqual(wheel.advance(5), ['b'])
+
+    def test_move(self):
+        """Test adding a key again moves it."""
+
+        wheel = TimerWheel(0)
+        wheel.add('a', 5)
+        wheel.add('a', 5000)
+        self.assertEqual(len(wheel), 1)
+        self.assertEqual(wheel.advance(4999), [])
+        self.assertEqual(wheel.advance(5000), ['a'])
+
+    def test_cascade(self):
+        """Test keys in every level of the wheel cascade down and expire on time."""
+
+        wheel = TimerWheel(0)
+        times = [SIZE - 1, SIZE, SIZE + 1, SIZE ** 2 - 1, SIZE ** 2 + 3, SIZE ** 3 + 7, SIZE ** 4 + 11]
+        for t in times:
+            wheel.add(t, t)
+        for t in times:
+            self.assertLessEqual(wheel.next_due(), t)
+            self.assertEqual(wheel.advance(t - 1), [])
+            self.assertEqual(wheel.advance(t), [t])
+
+    def test_lapse(self):
+        """Test a long lapse expires everything that is due at once."""
+
+        wheel = TimerWheel(0)
+        for t in range(0, 100000, 997):
+            wheel.add(t, t)
+        self.assertEqual(sorted(wheel.advance(50000)), list(range(0, 50001, 997)))
+
+    def test_resolution(self):
+        """Test times are rounded up to the resolution so keys never expire early."""
+
+        wheel = TimerWheel(0, 0.25)
+        wheel.add('a', 1.1)
+        self.assertEqual(wheel.advance(1.1), [])
+        self.assertEqual(wheel.advance(1.25), ['a'])
+
+    def test_clear(self):
+        """Test clearing the wheel."""
+
+        wheel = TimerWheel(0)
+        wheel.add('a', 5)
+        wheel.clear(10)
+        self.assertEqual(len(wheel), 0)
+        self.assertEqual(wheel.advance(20), [])
+
+    def test_random(self):
+        """Compare random adds, removes, and advances against the naive model."""
+
+        rand = random.Random(4)
+        for resolution in (1.0, 0.1):
+            now = 1000.0
+            wheel = TimerWheel(now, resolution)
+            naive = NaiveWheel(now, resolution)
+            for _ in range(5000):
+                action = rand.random()
+                if action < 0.5:
+                    key = rand.randrange(200)
+                    # Mostly near, sometimes far in the future, and now and then in the past.
+                    t = now + rand.choice((10, 1000, 100000, 100000000)) * resolution * rand.uniform(-0.1, 1)
+                    wheel.add(key, t)
+                    naive.add(key, t)
+                elif action < 0.7:
+                    key = rand.randrange(200)
+                    self.assertEqual(wheel.remove(key), naive.remove(key))
+                else:
+                    due = wheel.next_due()
+                    if due is not None and rand.random() < 0.5:
+                        # Next due is never after the earliest key.
+                        self.assertLessEqual(due, min(naive.keys.values()) * resolution)
+                        now = max(now, due)
+                    else:
+                        now += rand.choice((1, 100, 10000)) * resolution * rand.random()
+                    self.assertEqual(sorted(wheel.advance(now)), sorted(naive.advance(now)))
+                self.assertEqual(len(wheel), len(naive.keys))
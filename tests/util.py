@@ -0,0 +1,34 @@
+"""Test utilities."""
+import contextlib
+import os
+import time
+from datetime import datetime
+
+
+@contextlib.contextmanager
+def timezone(tz):
+    """Run with the local time zone set to `tz`."""
+
+    original = os.environ.get('TZ')
+    os.environ['TZ'] = tz
+    time.tzset()
+    try:
+        yield
+    finally:
+        if original is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = original
+        time.tzset()
+
+
+def timestamp(value):
+    """Get the timestamp of a local `YYYY-MM-DD HH:MM` time."""
+
+    return datetime.strptime(value, '%Y-%m-%d %H:%M').timestamp()
+
+
+def local(t):
+    """Format a timestamp as a local `YYYY-MM-DD HH:MM` time."""
+
+    return datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M')
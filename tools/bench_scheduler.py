@@ -0,0 +1,322 @@
+"""
+Scheduler benchmarks.
+
+Run from the project root:
+
+```
+python tools/bench_scheduler.py --events 100 10000 100000 --json bench.json
+```
+
+Results can be saved as JSON and compared against a previous run with `--compare`.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyluxa4 import scheduler, simulator, __meta__  # noqa: E402
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun', 'wkd', 'wke', 'all')
+DAY = 24 * 60 * 60
+logger = logging.getLogger('bench')
+
+
+class Handle:
+    """Device stand-in that does nothing."""
+
+    def color(self, *args, **kwargs):
+        """Color."""
+
+        return False
+
+    strobe = fade = wave = pattern = off = color
+
+
+def generate_schedule(count):
+    """Generate a schedule of events spread over the day and week."""
+
+    return [
+        {
+            "cmd": "color",
+            "days": DAYS[i % len(DAYS)],
+            "times": ['{:02d}:{:02d}'.format((i // 60) % 24, i % 60)],
+            "args": {"color": "red"}
+        } for i in range(count)
+    ]
+
+
+def generate_timers(count):
+    """Generate single shot timers that all go off a minute from now."""
+
+    return [
+        {
+            "cmd": "color",
+            "timer": 1,
+            "times": ["0:01"],
+            "args": {"color": "red"}
+        } for i in range(count)
+    ]
+
+
+def new_scheduler(records=None):
+    """Create a scheduler on a virtual clock."""
+
+    clock = simulator.VirtualClock(time.time())
+    sched = scheduler.Scheduler(Handle(), logger, clock)
+    if records is not None:
+        sched.read_schedule(records)
+    return sched, clock
+
+
+def bench_load(count):
+    """Load a schedule."""
+
+    records = generate_schedule(count)
+
+    def setup():
+        return new_scheduler()[0]
+
+    def run(sched):
+        sched.read_schedule(records)
+
+    return setup, run
+
+
+def bench_tick(count):
+    """Check the scheduler when nothing is due."""
+
+    records = generate_schedule(count) + generate_timers(count)
+
+    def setup():
+        return new_scheduler(records)[0]
+
+    def run(sched):
+        sched.check_records()
+
+    return setup, run
+
+
+def bench_rollover(count):
+    """Check the scheduler after a day has passed and every event needs rescheduling."""
+
+    records = generate_schedule(count)
+
+    def setup():
+        sched, clock = new_scheduler(records)
+        clock.now += DAY
+        return sched
+
+    def run(sched):
+        sched.check_records()
+
+    return setup, run
+
+
+def bench_fire(count):
+    """Check the scheduler when every scheduled event is due."""
+
+    records = [dict(entry, times=['12:00']) for entry in generate_schedule(count)]
+
+    def setup():
+        sched, clock = new_scheduler(records)
+        clock.now = sched.due_time()
+        return sched
+
+    def run(sched):
+        sched.check_records()
+
+    return setup, run
+
+
+def bench_timer_expiry(count):
+    """Check the scheduler when every timer fires and expires."""
+
+    records = generate_timers(count)
+
+    def setup():
+        sched, clock = new_scheduler(records)
+        clock.now += 61
+        return sched
+
+    def run(sched):
+        sched.check_records()
+
+    return setup, run
+
+
+def bench_get_schedule(count):
+    """Get the schedule."""
+
+    records = generate_schedule(count)
+
+    def setup():
+        return new_scheduler(records)[0]
+
+    def run(sched):
+        sched.get_schedule()
+
+    return setup, run
+
+
+def bench_get_timers(count):
+    """Get the timers."""
+
+    records = generate_timers(count)
+
+    def setup():
+        return new_scheduler(records)[0]
+
+    def run(sched):
+        sched.get_timers()
+
+    return setup, run
+
+
+def bench_snapshot(count):
+    """Serialize the schedule after it has changed."""
+
+    records = generate_schedule(count)
+
+    def setup():
+        return new_scheduler(records)[0]
+
+    def run(sched):
+        sched.get_snapshot()
+
+    return setup, run
+
+
+def bench_snapshot_hit(count):
+    """Get the serialized schedule when it has not changed, as when a client's ETag is checked."""
+
+    records = generate_schedule(count)
+
+    def setup():
+        sched = new_scheduler(records)[0]
+        sched.get_snapshot()
+        return sched
+
+    def run(sched):
+        sched.get_snapshot()
+
+    return setup, run
+
+
+def bench_clear_timers(count):
+    """Cancel all timers."""
+
+    records = generate_timers(count)
+
+    def setup():
+        return new_scheduler(records)[0]
+
+    def run(sched):
+        sched.clear_timers()
+
+    return setup, run
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'tick': bench_tick,
+    'rollover': bench_rollover,
+    'fire': bench_fire,
+    'timer_expiry': bench_timer_expiry,
+    'get_schedule': bench_get_schedule,
+    'get_timers': bench_get_timers,
+    'snapshot': bench_snapshot,
+    'snapshot_hit': bench_snapshot_hit,
+    'clear_timers': bench_clear_timers
+}
+
+
+def measure(setup, run, repeat):
+    """Time `run` against a fresh `setup` for each repeat and return the timings."""
+
+    timings = []
+    for _ in range(repeat):
+        obj = setup()
+        start = time.perf_counter()
+        run(obj)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def compare(results, path):
+    """Compare results against a previous run."""
+
+    with open(path, 'r') as f:
+        previous = {(r['name'], r['events']): r for r in json.load(f)['results']}
+
+    print('\ncompared to {}:'.format(path))
+    for r in results:
+        old = previous.get((r['name'], r['events']))
+        if old is None:
+            continue
+        print('{:<14} {:>7d}  {:>6.2f}x'.format(r['name'], r['events'], r['best'] / old['best']))
+
+
+def main():
+    """Main."""
+
+    parser = argparse.ArgumentParser(description="Scheduler benchmarks")
+    parser.add_argument(
+        '--events', type=int, nargs='+', default=[100, 10000, 100000], help="Number of events to schedule"
+    )
+    parser.add_argument('--repeat', type=int, default=5, help="Number of times to repeat each benchmark")
+    parser.add_argument(
+        '--bench', nargs='+', choices=sorted(BENCHMARKS), default=list(BENCHMARKS), help="Benchmarks to run"
+    )
+    parser.add_argument('--json', default=None, help="Save results to a JSON file")
+    parser.add_argument('--compare', default=None, help="Compare results with a previously saved JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.bench:
+        for count in args.events:
+            timings = measure(*BENCHMARKS[name](count), args.repeat)
+            best = min(timings)
+            result = {
+                'name': name,
+                'events': count,
+                'best': best,
+                'mean': sum(timings) / len(timings),
+                'timings': timings
+            }
+            results.append(result)
+            print(
+                '{:<14} {:>7d} events: {:>10.3f} ms ({:.3f} us/event)'.format(
+                    name, count, best * 1e3, best * 1e6 / count
+                )
+            )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(
+                {
+                    'meta': {
+                        'version': __meta__.__version__,
+                        'python': platform.python_version(),
+                        'platform': platform.platform(),
+                        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                        'repeat': args.repeat
+                    },
+                    'results': results
+                },
+                f,
+                indent=2
+            )
+
+    if args.compare:
+        compare(results, args.compare)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+USB command benchmarks.
+
+Measures the Python overhead of sending commands, from resolving colors to handing the report to `hid`, against a
+device stand-in that does nothing. Run from the project root:
+
+```
+python tools/bench_usb.py --calls 100000 --json bench.json
+```
+
+Results can be saved as JSON and compared against a previous run with `--compare`.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Device:
+    """HID device stand-in that accepts every write."""
+
+    def __init__(self, path=None, vid=None, pid=None, serial=None):
+        """Initialize."""
+
+        self.path = path
+
+    def write(self, data):
+        """Write."""
+
+        return len(data)
+
+    def read(self, size, timeout=None):
+        """Read."""
+
+        return b'\x00\x01\x00\x00\x00\x00\x00\x00'
+
+    def close(self):
+        """Close."""
+
+
+def enumerate(vid=0, pid=0):  # noqa: A001
+    """Enumerate the one device stand-in."""
+
+    return [{'path': b'/dev/bench0', 'serial_number': ''}]
+
+
+try:
+    import hid
+except ImportError:
+    # The benchmarks never touch a real device, so they can run where `hidapi` is not installed.
+    hid = types.ModuleType('hid')
+    hid.HIDException = type('HIDException', (Exception,), {})
+    sys.modules['hid'] = hid
+hid.Device = Device
+hid.enumerate = enumerate
+
+from pyluxa4 import usb, __meta__  # noqa: E402
+
+NAMES = ('red', 'green', 'blue', 'cyan', 'magenta', 'yellow', 'white', 'orange')
+COLORS = tuple('#{:02x}{:02x}{:02x}'.format(i * 4, 255 - i * 4, i) for i in range(64))
+
+
+def bench_color_same(device, calls):
+    """Set the same color over and over."""
+
+    color = device.color
+    for _ in range(calls):
+        color('#ff0000')
+
+
+def bench_color_force(device, calls):
+    """Set the same color over and over, forcing every write."""
+
+    color = device.color
+    for _ in range(calls):
+        color('#ff0000', force=True)
+
+
+def bench_color_hex(device, calls):
+    """Cycle through hex colors."""
+
+    color = device.color
+    for i in range(calls):
+        color(COLORS[i & 63])
+
+
+def bench_color_name(device, calls):
+    """Cycle through color names."""
+
+    color = device.color
+    for i in range(calls):
+        color(NAMES[i & 7])
+
+
+def bench_color_led(device, calls):
+    """Cycle through hex colors on each LED."""
+
+    color = device.color
+    for i in range(calls):
+        color(COLORS[i & 63], led=i % 6 + 1)
+
+
+def bench_fade(device, calls):
+    """Cycle through fades."""
+
+    fade = device.fade
+    for i in range(calls):
+        fade(COLORS[i & 63], speed=10)
+
+
+def bench_send_frame(device, calls):
+    """Send pre-encoded reports."""
+
+    frames = [bytes([0, usb.MODE_STATIC, usb.LED_ALL, *usb.resolve_color(c), 0, 0, 0]) for c in COLORS]
+    send_frame = device.send_frame
+    for i in range(calls):
+        send_frame(frames[i & 63])
+
+
+# Methods a benchmark needs, so older versions can still be measured (and compared) on the rest.
+bench_send_frame.requires = 'send_frame'
+
+
+BENCHMARKS = {
+    'color_same': bench_color_same,
+    'color_force': bench_color_force,
+    'color_hex': bench_color_hex,
+    'color_name': bench_color_name,
+    'color_led': bench_color_led,
+    'fade': bench_fade,
+    'send_frame': bench_send_frame
+}
+
+
+def measure(bench, calls, repeat):
+    """Time `bench` against a freshly opened device for each repeat and return the timings."""
+
+    requires = getattr(bench, 'requires', None)
+    if requires is not None and not hasattr(usb.Luxafor, requires):
+        return []
+
+    timings = []
+    for _ in range(repeat):
+        with usb.Luxafor() as device:
+            start = time.perf_counter()
+            bench(device, calls)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def compare(results, path):
+    """Compare results against a previous run."""
+
+    with open(path, 'r') as f:
+        previous = {(r['name'], r['calls']): r for r in json.load(f)['results']}
+
+    print('\ncompared to {}:'.format(path))
+    for r in results:
+        old = previous.get((r['name'], r['calls']))
+        if old is None:
+            continue
+        print('{:<14} {:>7d}  {:>6.2f}x'.format(r['name'], r['calls'], r['best'] / old['best']))
+
+
+def main():
+    """Main."""
+
+    parser = argparse.ArgumentParser(description="USB command benchmarks")
+    parser.add_argument('--calls', type=int, default=100000, help="Number of commands to send")
+    parser.add_argument('--repeat', type=int, default=5, help="Number of times to repeat each benchmark")
+    parser.add_argument(
+        '--bench', nargs='+', choices=sorted(BENCHMARKS), default=list(BENCHMARKS), help="Benchmarks to run"
+    )
+    parser.add_argument('--json', default=None, help="Save results to a JSON file")
+    parser.add_argument('--compare', default=None, help="Compare results with a previously saved JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.bench:
+        timings = measure(BENCHMARKS[name], args.calls, args.repeat)
+        if not timings:
+            print('{:<14} not supported'.format(name))
+            continue
+        best = min(timings)
+        result = {
+            'name': name,
+            'calls': args.calls,
+            'best': best,
+            'mean': sum(timings) / len(timings),
+            'timings': timings
+        }
+        results.append(result)
+        print(
+            '{:<14} {:>7d} calls: {:>10.3f} ms ({:.3f} us/call)'.format(
+                name, args.calls, best * 1e3, best * 1e6 / args.calls
+            )
+        )
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(
+                {
+                    'meta': {
+                        'version': __meta__.__version__,
+                        'python': platform.python_version(),
+                        'platform': platform.platform(),
+                        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                        'repeat': args.repeat
+                    },
+                    'results': results
+                },
+                f,
+                indent=2
+            )
+
+    if args.compare:
+        compare(results, args.compare)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())